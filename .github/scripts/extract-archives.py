@@ -7,64 +7,267 @@ It supports various archive formats and outputs paths for subsequent scanning.
 ClamAV scanning is handled separately by the workflow.
 """
 
+import os
+import re
+import fnmatch
+import queue
+import hashlib
+import mmap
 import shutil
+import subprocess
 import logging
 import tempfile
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
 from pathlib import Path
 from argparse import ArgumentParser
 import tarfile
 import gzip
 import zipfile
+import zlib
 try:
     import rarfile
     HAS_RARFILE = True
 except ImportError:
     HAS_RARFILE = False
-from typing import List
+try:
+    # SIMD-accelerated drop-in replacements for the stdlib gzip module
+    from isal import igzip as fast_gzip
+    HAS_FAST_GZIP = True
+except ImportError:
+    try:
+        from zlib_ng import gzip_ng as fast_gzip
+        HAS_FAST_GZIP = True
+    except ImportError:
+        HAS_FAST_GZIP = False
+try:
+    # Decodes a single gzip stream in parallel chunks across all cores
+    import rapidgzip
+    HAS_RAPIDGZIP = True
+except ImportError:
+    HAS_RAPIDGZIP = False
+try:
+    # SIMD-accelerated hash for spotting duplicate archives; SHA-256 is used otherwise
+    from blake3 import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+try:
+    import libarchive
+    HAS_LIBARCHIVE = True
+except (ImportError, OSError, AttributeError):
+    # libarchive-c fails with OSError/AttributeError when the C library itself is missing
+    HAS_LIBARCHIVE = False
+try:
+    # Compiles gitignore patterns into a single regex with full gitwildmatch semantics
+    import pathspec
+    HAS_PATHSPEC = True
+except ImportError:
+    HAS_PATHSPEC = False
+from typing import List, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Chunk size for streaming decompressed data to disk; large chunks mean fewer
+# read/write calls and fewer trips through the Python-level copy loop
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Read buffer for archives that are not memory-mapped; tarfile and gzip request small
+# chunks, and the default buffer (the filesystem block size) turns each into a read()
+READ_BUFFER_SIZE = 128 * 1024
+
+# Decompressed blocks buffered between the libarchive reader and the writer thread;
+# bounds memory when writes fall behind decompression
+WRITE_QUEUE_SIZE = 32
+
+# Gzip streams at least this large are decoded in parallel with rapidgzip when it is installed;
+# below this the thread start-up cost outweighs the gain
+PARALLEL_GZIP_THRESHOLD = 64 * 1024 * 1024
+
+# Zip members are compressed independently, so archives at least this large have
+# their members inflated on several threads at once
+PARALLEL_ZIP_THRESHOLD = 64 * 1024 * 1024
+
+# External decompressors that run beside tar parsing in their own process: xz decodes multi-block
+# streams on all cores, and pigz moves reading and CRC checks onto extra threads
+XZ_PATH = shutil.which('xz')
+PIGZ_PATH = shutil.which('pigz')
+
+# Tar archives at least this large are memory-mapped instead of read through a file buffer
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+
+@contextmanager
+def _open_archive_file(archive_path: Path):
+    """Open an archive for reading, memory-mapping it when it is large.
+
+    Mapped archives are read straight out of the page cache instead of being
+    copied into a userspace buffer chunk by chunk.
+    """
+    with open(archive_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            yield f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            yield mapped
+
+
+@contextmanager
+def _open_gzip(archive_path: Path):
+    """Open a gzip file for reading with the fastest available decompressor."""
+    if HAS_RAPIDGZIP and archive_path.stat().st_size >= PARALLEL_GZIP_THRESHOLD:
+        with rapidgzip.open(str(archive_path), parallelization=os.cpu_count()) as stream:
+            yield stream
+    elif HAS_FAST_GZIP:
+        with _open_archive_file(archive_path) as raw, fast_gzip.open(raw, 'rb') as stream:
+            yield stream
+    else:
+        with open(archive_path, 'rb', buffering=READ_BUFFER_SIZE) as raw, gzip.open(raw, 'rb') as stream:
+            yield stream
+
+
+def _open_tar_stream(fileobj, mode: str = 'r|') -> tarfile.TarFile:
+    """Open a tar stream for sequential reading with large read and member-copy buffers."""
+    # bufsize is the size of each read from fileobj in stream mode (10 KiB by default)
+    return tarfile.open(fileobj=fileobj, mode=mode, bufsize=COPY_BUFFER_SIZE, copybufsize=COPY_BUFFER_SIZE)
+
+
+# One copy buffer per thread, reused by every copy that thread performs
+_copy_buffers = threading.local()
+
+
+def _copy_stream(f_in, f_out, charge=None) -> None:
+    """Copy a binary stream through the thread's reused buffer rather than allocating per chunk or per call.
+
+    If given, charge is called with the size of each chunk before it is written.
+    """
+    view = getattr(_copy_buffers, 'view', None)
+    if view is None:
+        view = _copy_buffers.view = memoryview(bytearray(COPY_BUFFER_SIZE))
+    while size := f_in.readinto(view):
+        if charge:
+            charge(size)
+        f_out.write(view[:size])
+
+
+class ExtractionLimitError(OSError):
+    """Raised when extraction would exceed the total size budget.
+
+    An OSError, so each extractor's existing error handling abandons the archive.
+    """
+
+
 class ArchiveExtractor:
     """
     A class for recursively extracting nested archives of various formats.
     """
 
-    SUPPORTED_EXTENSIONS = {
+    # Extraction method for each supported extension
+    EXTRACTORS = {
         # Tar formats
-        'tar', 'tgz', 'tbz', 'tb2', 'tar.gz', 'tar.bz2', 'tar.xz',
+        'tar': '_extract_tar', 'tgz': '_extract_tar', 'tbz': '_extract_tar', 'tb2': '_extract_tar',
+        'tar.gz': '_extract_tar', 'tar.bz2': '_extract_tar', 'tar.xz': '_extract_tar',
         # Zip formats
-        'zip',
+        'zip': '_extract_zip',
         # Rar formats
-        'rar',
+        'rar': '_extract_rar',
         # Gzip
-        'gz'
+        'gz': '_extract_gz',
+        # Formats only libarchive can read
+        '7z': '_extract_libarchive_only', 'tar.zst': '_extract_libarchive_only',
+        'tzst': '_extract_libarchive_only', 'cpio': '_extract_libarchive_only',
     }
 
-    def __init__(self, output_dir: str = None, base_path: Path = None):
+    SUPPORTED_EXTENSIONS = frozenset(EXTRACTORS)
+
+    # One anchored pattern for all extensions; compound extensions such as tar.gz are tried
+    # before their last component, and a stem is required so dotfiles like '.gz' do not match
+    _EXTENSION_PATTERN = re.compile(
+        r'.\.(' + '|'.join(re.escape(ext) for ext in sorted(EXTRACTORS, key=len, reverse=True)) + r')\Z'
+    )
+
+    # Leading bytes of each format as (offset, signature, extraction method); content wins over the extension
+    MAGIC_NUMBERS = (
+        (0, b'PK\x03\x04', '_extract_zip'),
+        (0, b'PK\x05\x06', '_extract_zip'),
+        (0, b'Rar!\x1a\x07', '_extract_rar'),
+        (0, b'\x1f\x8b', '_extract_gz'),
+        (0, b'\xfd7zXZ\x00', '_extract_tar'),
+        (0, b'BZh', '_extract_tar'),
+        (257, b'ustar', '_extract_tar'),
+        (0, b'7z\xbc\xaf\x27\x1c', '_extract_libarchive_only'),
+        (0, b'\x28\xb5\x2f\xfd', '_extract_libarchive_only'),
+        (0, b'070701', '_extract_libarchive_only'),
+        (0, b'070707', '_extract_libarchive_only'),
+    )
+
+    # Directory names that are never searched for archives
+    EXCLUDE_DIRS = frozenset({
+        '.git', 'node_modules', '__pycache__', '.venv', 'venv', '.tox',
+        '.pytest_cache', 'htmlcov', 'coverage', '.coverage',
+        'tests', 'test', '__tests__', 'spec', 'specs'
+    })
+
+    # Directory names the scan step prunes wherever they appear (the workflow's find -prune list);
+    # archive members below them would never be scanned, so they are not written out
+    UNSCANNED_DIRS = frozenset({
+        '.git', 'node_modules', '.venv', '__pycache__', 'htmlcov', 'coverage', '.pytest_cache'
+    })
+
+    # Shared by all instances so extractors writing to the same output_dir never reuse a directory name
+    _extract_ids = itertools.count()
+
+    def __init__(self, output_dir: str = None, base_path: Path = None, max_workers: int = None,
+                 max_depth: int = 8, max_total_bytes: int = 10 * 1024 ** 3, seen_digests: set = None):
         self.output_dir = Path(output_dir) if output_dir else Path(tempfile.mkdtemp())
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Resolved once; compared against every input and directory in the walk
+        self._output_dir_resolved = self.output_dir.resolve()
+        # Trailing separator so a prefix test cannot match a sibling such as "output-old"
+        self._output_dir_prefix = os.path.join(str(self._output_dir_resolved), '')
         self.extracted_paths = []
         self.errors = []
-        # Base directories/patterns to exclude from scanning
-        self.exclude_dirs = {
-            '.git', 'node_modules', '__pycache__', '.venv', 'venv', '.tox',
-            '.pytest_cache', 'htmlcov', 'coverage', '.coverage',
-            'tests', 'test', '__tests__', 'spec', 'specs'
-        }
+        # Extraction runs on a thread pool: decompression and file I/O release the GIL
+        self.max_workers = max_workers or os.cpu_count()
+        self._lock = threading.Lock()
+        # Archives being extracted right now; nested thread pools split max_workers between them
+        self._active_extractions = 0
+        # Nesting and total-size limits stop archive bombs from exhausting disk and CI time
+        self.max_depth = max_depth
+        self.max_total_bytes = max_total_bytes
+        self.total_bytes = 0
+        # Content digests of archives already extracted; identical copies are only extracted once.
+        # A set passed in is shared with other extractors run one after another on the same output_dir
+        self._seen_digests = seen_digests if seen_digests is not None else set()
+        # Base directories to exclude from scanning, shared with the class unless overridden
+        self.exclude_dirs = self.EXCLUDE_DIRS
         # Load additional exclusions from ignore files
         self.exclude_patterns = set()
+        self._ignore_spec = None
+        self._ignore_pattern = None
         if base_path:
             self._load_ignore_files(base_path)
 
     def is_archive(self, file_path: Path) -> bool:
         """Check if a file is a supported archive."""
-        return file_path.suffix.lower().lstrip('.') in self.SUPPORTED_EXTENSIONS
+        return self._archive_extension(file_path) is not None
+
+    def _archive_extension(self, file_path: Path) -> Optional[str]:
+        """Return the supported extension of a file (e.g. 'tar.gz'), or None if it is not an archive."""
+        match = self._EXTENSION_PATTERN.search(file_path.name.lower())
+        return match.group(1) if match else None
 
     def _load_ignore_files(self, base_path: Path) -> None:
         """Load patterns from .gitignore and .dockerignore files."""
         ignore_files = ['.gitignore', '.dockerignore']
+        ignore_lines = []
 
         for ignore_file in ignore_files:
             ignore_path = base_path / ignore_file
@@ -75,6 +278,7 @@ class ArchiveExtractor:
                             line = line.strip()
                             # Skip comments and empty lines
                             if line and not line.startswith('#'):
+                                ignore_lines.append(line)
                                 # Remove leading/trailing slashes for consistency
                                 pattern = line.strip('/')
                                 self.exclude_patterns.add(pattern)
@@ -82,25 +286,49 @@ class ArchiveExtractor:
                 except (OSError, UnicodeDecodeError) as e:
                     logger.warning("Failed to read %s: %s", ignore_file, e)
 
+        if HAS_PATHSPEC and ignore_lines:
+            self._ignore_spec = pathspec.PathSpec.from_lines('gitwildmatch', ignore_lines)
+        elif self.exclude_patterns:
+            # Without pathspec, fold every pattern into a single alternation
+            self._ignore_pattern = re.compile('|'.join(
+                self._ignore_regex(pattern) for pattern in sorted(self.exclude_patterns, key=len, reverse=True)))
+
+    @staticmethod
+    def _ignore_regex(pattern: str) -> str:
+        """Translate one ignore pattern for the fallback matcher.
+
+        Plain patterns match anywhere in the relative path; glob patterns such as '*.log'
+        must match whole path components.
+        """
+        if not any(char in pattern for char in '*?['):
+            return re.escape(pattern)
+        # fnmatch.translate anchors the end with \Z; anchor to component boundaries instead
+        return r'(?:^|/)' + fnmatch.translate(pattern)[:-2] + r'(?=/|\Z)'
+
     def _should_exclude(self, path: Path, base_path: Path = None) -> bool:
         """Check if a path should be excluded based on patterns and directory names."""
         # Check if any parent directory matches exclude_dirs
-        if any(part in self.exclude_dirs for part in path.parts):
+        if not self.exclude_dirs.isdisjoint(path.parts):
             return True
+        return self._matches_ignore_patterns(path, base_path)
 
-        # Check against patterns from ignore files
+    def _matches_ignore_patterns(self, path: Path, base_path: Path = None) -> bool:
+        """Check a path against the patterns loaded from ignore files."""
         if base_path and self.exclude_patterns:
             try:
                 rel_path = path.relative_to(base_path)
                 rel_path_str = str(rel_path)
 
-                for pattern in self.exclude_patterns:
-                    # Simple pattern matching (not full gitignore spec, but covers common cases)
-                    if pattern in rel_path_str or rel_path_str.startswith(pattern):
-                        return True
-                    # Check if any component matches
-                    if pattern in path.parts:
-                        return True
+                # One compiled-regex match instead of a string scan per pattern
+                if self._ignore_spec is not None:
+                    return self._ignore_spec.match_file(rel_path_str)
+
+                # Simple pattern matching (not full gitignore spec, but covers common cases):
+                # see _ignore_regex, plus an exact match against any path component
+                if self._ignore_pattern is not None and self._ignore_pattern.search(rel_path_str):
+                    return True
+                if not self.exclude_patterns.isdisjoint(path.parts):
+                    return True
             except ValueError:
                 # Path is not relative to base_path
                 pass
@@ -110,50 +338,274 @@ class ArchiveExtractor:
     def extract_archive(self, archive_path: Path, extract_to: Path) -> bool:
         """Extract a single archive file."""
         try:
-            if archive_path.suffix.lower() in ['.tar', '.tgz', '.tbz', '.tb2', '.tar.gz', '.tar.bz2', '.tar.xz']:
-                return self._extract_tar(archive_path, extract_to)
-            elif archive_path.suffix.lower() == '.zip':
-                return self._extract_zip(archive_path, extract_to)
-            elif archive_path.suffix.lower() == '.rar':
-                return self._extract_rar(archive_path, extract_to)
-            elif archive_path.suffix.lower() == '.gz':
-                return self._extract_gz(archive_path, extract_to)
-            else:
+            extension = self._archive_extension(archive_path)
+            if extension is None:
                 logger.warning("Unsupported archive format: %s", archive_path)
                 return False
-        except (OSError, ValueError, tarfile.TarError, zipfile.BadZipFile) as e:
+            method = self.EXTRACTORS[extension]
+            sniffed = self._sniff_format(archive_path)
+            # A gzip signature is expected for compressed tars, which _extract_tar handles itself
+            if sniffed and sniffed != method and not (sniffed == '_extract_gz' and method == '_extract_tar'):
+                logger.debug("Content of %s does not match its extension, using %s", archive_path, sniffed)
+                method = sniffed
+            return getattr(self, method)(archive_path, extract_to)
+        # Truncated or corrupt compressed streams raise EOFError or zlib.error rather than OSError
+        except (OSError, ValueError, EOFError, zlib.error, tarfile.TarError, zipfile.BadZipFile) as e:
             logger.error("Failed to extract %s: %s", archive_path, e)
             self.errors.append(str(e))
             return False
 
+    @staticmethod
+    def _read_header(archive_path: Path) -> bytes:
+        """Return the first 512 bytes of a file, enough for every signature in MAGIC_NUMBERS."""
+        fd = os.open(archive_path, os.O_RDONLY)
+        try:
+            return os.pread(fd, 512, 0)
+        finally:
+            os.close(fd)
+
+    def _sniff_format(self, archive_path: Path) -> Optional[str]:
+        """Return the extraction method matching the file's magic number, or None if none matches."""
+        header = self._read_header(archive_path)
+        for offset, signature, method in self.MAGIC_NUMBERS:
+            if header.startswith(signature, offset):
+                return method
+        return None
+
+    @classmethod
+    def _is_unscanned_member(cls, name: str) -> bool:
+        """Check whether an archive member lies below a directory the scan skips."""
+        return not cls.UNSCANNED_DIRS.isdisjoint(name.split('/'))
+
+    def _extract_libarchive(self, archive_path: Path, extract_to: Path) -> bool:
+        """Extract tar, zip and rar archives with libarchive in a single streaming pass.
+
+        Decompression runs on the calling thread while a writer thread drains the
+        decompressed blocks to disk, so inflating and writing overlap.
+        """
+        blocks = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        write_errors = []
+        writer = threading.Thread(target=self._write_blocks, args=(blocks, write_errors), daemon=True)
+        writer.start()
+        try:
+            root = extract_to.resolve()
+            root.mkdir(parents=True, exist_ok=True)
+            with libarchive.file_reader(str(archive_path)) as archive:
+                for entry in archive:
+                    # Lexical normalisation is enough: no symlinks are ever created below root
+                    target = Path(os.path.normpath(root / entry.pathname))
+                    # Never write outside the extraction directory
+                    if not target.is_relative_to(root):
+                        logger.warning("Skipping unsafe member %s in %s", entry.pathname, archive_path)
+                        continue
+                    if self._is_unscanned_member(entry.pathname):
+                        continue
+                    if entry.isdir:
+                        target.mkdir(parents=True, exist_ok=True)
+                    elif entry.isreg:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        blocks.put(target)
+                        for block in entry.get_blocks():
+                            self._charge(len(block))
+                            blocks.put(block)
+                    # Links and special files are skipped; their targets are scanned in place
+        except (OSError, libarchive.ArchiveError) as e:
+            logger.error("Failed to extract %s with libarchive: %s", archive_path, e)
+            return False
+        finally:
+            blocks.put(None)
+            writer.join()
+
+        if write_errors:
+            logger.error("Failed to extract %s with libarchive: %s", archive_path, write_errors[0])
+            return False
+        return True
+
+    @staticmethod
+    def _write_blocks(blocks: queue.Queue, errors: list):
+        """Write queued blocks to disk until the None sentinel arrives.
+
+        A Path starts a new output file; bytes are appended to the current one. After a
+        write error the remaining blocks are still drained so the producer never blocks.
+        """
+        f_out = None
+        try:
+            while (item := blocks.get()) is not None:
+                if errors:
+                    continue
+                try:
+                    if isinstance(item, Path):
+                        if f_out:
+                            f_out.close()
+                        f_out = open(item, 'wb')  # pylint: disable=consider-using-with
+                    else:
+                        f_out.write(item)
+                except OSError as e:
+                    errors.append(e)
+        finally:
+            if f_out:
+                f_out.close()
+
+    def _extract_libarchive_only(self, archive_path: Path, extract_to: Path) -> bool:
+        """Extract formats with no stdlib fallback (7z, zstd-compressed tar, cpio)."""
+        if not HAS_LIBARCHIVE:
+            logger.warning("libarchive not available, skipping extraction: %s", archive_path)
+            return False
+        return self._extract_libarchive(archive_path, extract_to)
+
     def _extract_tar(self, archive_path: Path, extract_to: Path) -> bool:
         """Extract tar archives."""
+        # Route on the compression found in the content, not the name: a gzip stream named .tar.xz stays gzip
+        header = self._read_header(archive_path)
+        is_gzip = header.startswith(b'\x1f\x8b')
+        if XZ_PATH and header.startswith(b'\xfd7zXZ\x00'):
+            command = [XZ_PATH, '--decompress', '--stdout', '--threads=0']
+            return self._extract_tar_piped(archive_path, extract_to, command)
+        # isal, zlib-ng and rapidgzip all inflate faster in-process than pigz, so it is only a fallback
+        if PIGZ_PATH and not (HAS_FAST_GZIP or HAS_RAPIDGZIP) and is_gzip:
+            return self._extract_tar_piped(archive_path, extract_to, [PIGZ_PATH, '--decompress', '--stdout'])
+        if HAS_LIBARCHIVE:
+            return self._extract_libarchive(archive_path, extract_to)
+        try:
+            if (HAS_FAST_GZIP or HAS_RAPIDGZIP) and is_gzip:
+                # Decompress with the faster gzip implementation and stream it into tarfile
+                with _open_gzip(archive_path) as stream:
+                    with _open_tar_stream(stream) as tar:
+                        self._extract_tar_members(tar, extract_to)
+                return True
+            # Stream mode reads members sequentially without seeking back through the file
+            with _open_archive_file(archive_path) as raw, _open_tar_stream(raw, 'r|*') as tar:
+                self._extract_tar_members(tar, extract_to)
+            return True
+        except (OSError, EOFError, zlib.error, tarfile.TarError) as e:
+            logger.error("Failed to extract tar %s: %s", archive_path, e)
+            return False
+
+    def _extract_tar_piped(self, archive_path: Path, extract_to: Path, command: List[str]) -> bool:
+        """Extract a compressed tar archive, decompressing it with an external command."""
         try:
-            with tarfile.open(archive_path, 'r:*') as tar:
-                tar.extractall(extract_to)
+            with subprocess.Popen(command + [str(archive_path)],
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE) as decompressor:
+                with _open_tar_stream(decompressor.stdout) as tar:
+                    self._extract_tar_members(tar, extract_to)
+                # tarfile stops at the end-of-archive marker; drain what follows so the decompressor
+                # cannot block on a full stdout pipe while stderr is being read
+                while decompressor.stdout.read(COPY_BUFFER_SIZE):
+                    pass
+                stderr = decompressor.stderr.read()
+            if decompressor.returncode != 0:
+                raise tarfile.ReadError(stderr.decode(errors='replace').strip())
             return True
         except (OSError, tarfile.TarError) as e:
             logger.error("Failed to extract tar %s: %s", archive_path, e)
             return False
 
+    def _extract_tar_members(self, tar: tarfile.TarFile, extract_to: Path) -> None:
+        """Extract the members of an open tar archive, using the PEP 706 data filter when available."""
+        if hasattr(tarfile, 'data_filter'):
+            tar.extractall(extract_to, members=self._tar_members(tar, extract_to), filter='data')
+        else:
+            tar.extractall(extract_to, members=self._tar_members(tar, extract_to))
+
+    def _tar_members(self, tar: tarfile.TarFile, extract_to: Path):
+        """Yield the members to extract, charging each one's size before it is written.
+
+        A generator keeps stream mode working: members are filtered as they are read.
+        """
+        for member in tar:
+            if self._is_unscanned_member(member.name):
+                continue
+            if hasattr(tarfile, 'data_filter'):
+                # Filter here rather than only in extractall, where the first unsafe member
+                # raises and abandons every member after it
+                try:
+                    member = tarfile.data_filter(member, str(extract_to))
+                except tarfile.FilterError as e:
+                    logger.warning("Skipping unsafe member %s: %s", member.name, e)
+                    continue
+            # tarfile writes exactly member.size bytes for a regular file
+            self._charge(member.size if member.isreg() else 0)
+            yield member
+
     def _extract_zip(self, archive_path: Path, extract_to: Path) -> bool:
         """Extract zip archives."""
+        if HAS_LIBARCHIVE:
+            return self._extract_libarchive(archive_path, extract_to)
         try:
+            root = extract_to.resolve()
+            members = []
             with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_to)
+                for info in zip_ref.infolist():
+                    # Lexical normalisation is enough: zip extraction never creates symlinks
+                    target = Path(os.path.normpath(root / info.filename))
+                    # Never write outside the extraction directory
+                    if not target.is_relative_to(root):
+                        logger.warning("Skipping unsafe member %s in %s", info.filename, archive_path)
+                        continue
+                    if self._is_unscanned_member(info.filename):
+                        continue
+                    if info.is_dir():
+                        target.mkdir(parents=True, exist_ok=True)
+                        continue
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    members.append((info, target))
+
+                if len(members) < 2 or archive_path.stat().st_size < PARALLEL_ZIP_THRESHOLD:
+                    for info, target in members:
+                        self._extract_zip_member(zip_ref, info, target)
+                    return True
+
+            self._extract_zip_members_parallel(archive_path, members)
             return True
         except (OSError, zipfile.BadZipFile) as e:
             logger.error("Failed to extract zip %s: %s", archive_path, e)
             return False
 
+    def _extract_zip_member(self, zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path) -> None:
+        """Copy one zip member through a large reused buffer instead of extractall's 64 KiB chunks."""
+        # Charged as inflated rather than by the declared file_size, which the archive controls
+        with zip_ref.open(info) as f_in, open(target, 'wb') as f_out:
+            _copy_stream(f_in, f_out, self._charge)
+
+    def _extract_zip_members_parallel(self, archive_path: Path, members: list) -> None:
+        """Inflate zip members concurrently; each worker thread reads through its own ZipFile handle."""
+        local = threading.local()
+        handles = []
+
+        def extract(member):
+            if not hasattr(local, 'zip_ref'):
+                local.zip_ref = zipfile.ZipFile(archive_path, 'r')  # pylint: disable=consider-using-with
+                with self._lock:
+                    handles.append(local.zip_ref)
+            self._extract_zip_member(local.zip_ref, *member)
+
+        # This runs on one of extract_recursively's workers: share the cores with the other archives
+        # being extracted, so several large zips at once cannot start max_workers threads each
+        with self._lock:
+            workers = max(1, self.max_workers // max(1, self._active_extractions))
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Consuming the results re-raises the first worker error
+                list(executor.map(extract, members))
+        finally:
+            for handle in handles:
+                handle.close()
+
     def _extract_rar(self, archive_path: Path, extract_to: Path) -> bool:
         """Extract rar archives."""
+        if HAS_LIBARCHIVE:
+            return self._extract_libarchive(archive_path, extract_to)
         if not HAS_RARFILE:
             logger.warning("rarfile module not available, skipping RAR extraction: %s", archive_path)
             return False
         try:
             with rarfile.RarFile(archive_path, 'r') as rar:
-                rar.extractall(extract_to)
+                members = [info for info in rar.infolist() if not self._is_unscanned_member(info.filename)]
+                # rarfile writes the members itself, so their sizes are charged before anything is written
+                for info in members:
+                    self._charge(info.file_size)
+                rar.extractall(extract_to, members=members)
             return True
         except (OSError, rarfile.Error) as e:
             logger.error("Failed to extract rar %s: %s", archive_path, e)
@@ -163,17 +615,28 @@ class ArchiveExtractor:
         """Extract gzipped files."""
         try:
             output_file = extract_to / archive_path.stem
-            with gzip.open(archive_path, 'rb') as f_in:
-                with open(output_file, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+            with _open_gzip(archive_path) as f_in:
+                is_tar = f_in.read(512)[257:262] == b'ustar'
+                # Rewinding only re-decompresses the header block just read
+                f_in.seek(0)
+                if is_tar:
+                    # A tarball without a .tar.gz name: stream it into tarfile rather than writing the tar to disk
+                    with _open_tar_stream(f_in) as tar:
+                        self._extract_tar_members(tar, extract_to)
+                else:
+                    with open(output_file, 'wb') as f_out:
+                        _copy_stream(f_in, f_out, self._charge)
             return True
-        except (OSError, gzip.BadGzipFile) as e:
+        except (OSError, EOFError, zlib.error, gzip.BadGzipFile, tarfile.TarError) as e:
             logger.error("Failed to extract gz %s: %s", archive_path, e)
             return False
 
     def extract_recursively(self, input_path: Path, base_path: Path = None) -> List[Path]:
         """Recursively extract archives starting from input_path.
 
+        Archives are extracted concurrently on a thread pool; every archive found
+        inside extracted content is queued back onto the same pool.
+
         Args:
             input_path: Path to extract from
             base_path: Base path for relative pattern matching (usually the original scan root)
@@ -184,16 +647,11 @@ class ArchiveExtractor:
 
         # Resolve to absolute path to properly compare with output_dir
         input_path = input_path.resolve()
-        output_dir_resolved = self.output_dir.resolve()
 
         # Skip if this path is inside the output directory (prevent infinite loops)
-        try:
-            input_path.relative_to(output_dir_resolved)
+        if os.path.join(str(input_path), '').startswith(self._output_dir_prefix):
             logger.debug("Skipping path inside output directory: %s", input_path)
             return []
-        except ValueError:
-            # Path is not relative to output_dir, continue processing
-            pass
 
         # Skip excluded paths
         if self._should_exclude(input_path, base_path):
@@ -201,53 +659,158 @@ class ArchiveExtractor:
             return []
 
         if input_path.is_file():
-            if self.is_archive(input_path):
-                extract_dir = self.output_dir / f"extracted_{input_path.stem}_{len(self.extracted_paths)}"
-                extract_dir.mkdir(parents=True, exist_ok=True)
-
-                if self.extract_archive(input_path, extract_dir):
-                    self.extracted_paths.append(extract_dir)
-                    logger.info("Extracted %s to %s", input_path, extract_dir)
-
-                    # Recursively extract any archives found in the extracted content
-                    for item in extract_dir.rglob('*'):
-                        if item.is_file() and self.is_archive(item):
-                            self.extract_recursively(item, base_path)
-                else:
-                    logger.error("Failed to extract %s", input_path)
+            archives = [input_path] if self.is_archive(input_path) else []
             # Note: Non-archive files are NOT copied - they'll be scanned in place
-
         elif input_path.is_dir():
-            # If the input is a directory, iterate over its contents
-            # Only process archives, skip excluded directories
-            for item in input_path.iterdir():
-                # Skip excluded paths
-                if self._should_exclude(item, base_path):
-                    logger.debug("Skipping excluded path: %s", item)
-                    continue
-
-                # Only recursively process if it's an archive or a directory (to find archives)
-                if item.is_file():
-                    if self.is_archive(item):
-                        self.extract_recursively(item, base_path)
-                    # Skip non-archive files - they'll be scanned directly
-                elif item.is_dir():
-                    self.extract_recursively(item, base_path)
+            archives = self._find_archives(input_path, base_path)
+        else:
+            archives = []
+
+        if not archives:
+            return self.extracted_paths
+
+        budget_exceeded = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Maps each running extraction to the nesting depth of its archive
+            pending = {executor.submit(self._extract_one, archive): 1 for archive in archives}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = pending.pop(future)
+                    extract_dir = future.result()
+                    # An archive that crossed the budget was abandoned part-way and returned None
+                    if not budget_exceeded and self.total_bytes > self.max_total_bytes:
+                        budget_exceeded = True
+                        message = f"Extraction stopped after exceeding {self.max_total_bytes} bytes"
+                        logger.warning(message)
+                        self.errors.append(message)
+                    if extract_dir is None or budget_exceeded:
+                        continue
+
+                    # Queue any archives found in the extracted content
+                    nested_archives = self._find_archives(extract_dir, base_path)
+                    if nested_archives and depth >= self.max_depth:
+                        message = f"Not extracting archives nested deeper than {self.max_depth} levels in {extract_dir}"
+                        logger.warning(message)
+                        self.errors.append(message)
+                        continue
+                    for nested in nested_archives:
+                        pending[executor.submit(self._extract_one, nested)] = depth + 1
 
         return self.extracted_paths
 
-def main(input_paths: List[str], output_dir: str):
+    def _find_archives(self, root: Path, base_path: Path = None) -> List[Path]:
+        """Collect the archives below a directory, skipping excluded paths and the output directory."""
+        output_dir_resolved = str(self._output_dir_resolved)
+        archives = []
+        directories = deque([root])
+        while directories:
+            directory = directories.popleft()
+            # scandir entries carry the file type from readdir, so no stat() is needed per entry
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # Excluded directories are never descended into, so every ancestor has already
+                    # passed the directory-name check; only this entry's own name needs checking
+                    if entry.name in self.exclude_dirs:
+                        logger.debug("Skipping excluded path: %s", entry.path)
+                        continue
+
+                    # Symlinks are never followed, avoiding loops and extracting the same archive twice.
+                    # Only archives matter here - non-archive files are scanned directly, so they are
+                    # rejected on the name string before any Path object is built
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if is_dir:
+                        if entry.path == output_dir_resolved:
+                            continue
+                    elif not entry.is_file(follow_symlinks=False) or \
+                            not self._EXTENSION_PATTERN.search(entry.name.lower()):
+                        continue
+
+                    item = Path(entry.path)
+                    if self._matches_ignore_patterns(item, base_path):
+                        logger.debug("Skipping excluded path: %s", item)
+                        continue
+                    if is_dir:
+                        directories.append(item)
+                    else:
+                        archives.append(item)
+        return archives
+
+    def _extract_one(self, archive_path: Path) -> Optional[Path]:
+        """Extract one archive into its own directory under output_dir.
+
+        Returns:
+            The extraction directory, or None if extraction failed or the archive is a duplicate.
+        """
+        if self.total_bytes > self.max_total_bytes:
+            logger.debug("Skipping %s, the extraction size budget is spent", archive_path)
+            return None
+
+        try:
+            with open(archive_path, 'rb') as archive_file:
+                digest = hashlib.file_digest(archive_file, blake3 if HAS_BLAKE3 else 'sha256').digest()
+            with self._lock:
+                duplicate = digest in self._seen_digests
+                self._seen_digests.add(digest)
+            if duplicate:
+                logger.info("Skipping %s, identical to an archive already extracted", archive_path)
+                return None
+
+            extract_dir = self.output_dir / f"extracted_{archive_path.stem}_{next(self._extract_ids)}"
+            extract_dir.mkdir(parents=True, exist_ok=True)
+
+            with self._lock:
+                self._active_extractions += 1
+            try:
+                extracted = self.extract_archive(archive_path, extract_dir)
+            finally:
+                with self._lock:
+                    self._active_extractions -= 1
+            if not extracted:
+                logger.error("Failed to extract %s", archive_path)
+                return None
+        except OSError as e:
+            # An unreadable or vanished archive must not stop the other extractions
+            logger.error("Failed to extract %s: %s", archive_path, e)
+            self.errors.append(str(e))
+            return None
+        with self._lock:
+            self.extracted_paths.append(extract_dir)
+        logger.info("Extracted %s to %s", archive_path, extract_dir)
+        return extract_dir
+
+    def _charge(self, size: int) -> None:
+        """Count bytes about to be written against max_total_bytes.
+
+        Charged per member or chunk as it is written, so a single archive bomb is
+        stopped part-way instead of after it has filled the disk.
+
+        Raises:
+            ExtractionLimitError: If the budget is exceeded.
+        """
+        with self._lock:
+            self.total_bytes += size
+            exceeded = self.total_bytes > self.max_total_bytes
+        if exceeded:
+            raise ExtractionLimitError(f"Extraction stopped after exceeding {self.max_total_bytes} bytes")
+
+def main(input_paths: List[str], output_dir: str = None, jobs: int = None):
     """
     Main function to extract archives for ClamAV scanning.
 
     Args:
         input_paths (List[str]): List of input file or directory paths.
-        output_dir (str): Output directory for extracted files.
+        output_dir (str): Output directory for extracted files (default: a new temp directory).
+        jobs (int): Number of archives to extract concurrently (default: CPU count).
 
     Returns:
         Prints paths to scan (original path and/or extracted directories) to stdout.
     """
     paths_to_scan = []
+    extracted_any = False
+    # Every input extracts into the same directory, and an archive found under several inputs only once
+    output_dir = Path(output_dir) if output_dir else Path(tempfile.mkdtemp())
+    seen_digests = set()
 
     for input_path in input_paths:
         path = Path(input_path).resolve()
@@ -261,15 +824,15 @@ def main(input_paths: List[str], output_dir: str):
         base_path = path if path.is_dir() else path.parent
 
         # Create extractor with exclusions
-        extractor = ArchiveExtractor(output_dir, base_path=base_path)
+        extractor = ArchiveExtractor(str(output_dir), base_path=base_path, max_workers=jobs,
+                                     seen_digests=seen_digests)
 
         # Extract any archives found
         extracted_paths = extractor.extract_recursively(path, base_path=base_path)
 
         if extracted_paths:
             logger.info("Found and extracted %d archive(s)", len(extracted_paths))
-            # Add extraction output directory to scan paths
-            paths_to_scan.append(str(extractor.output_dir))
+            extracted_any = True
 
         # If input is a directory or a non-archive file, add it to scan paths
         if path.is_dir():
@@ -277,6 +840,10 @@ def main(input_paths: List[str], output_dir: str):
         elif path.is_file() and not extractor.is_archive(path):
             paths_to_scan.append(str(path))
 
+    # All inputs extract into the same output directory, so it only needs scanning once
+    if extracted_any:
+        paths_to_scan.insert(0, str(output_dir))
+
     # Output paths to scan (one per line for easy parsing)
     if paths_to_scan:
         logger.info("Paths to scan:")
@@ -291,6 +858,8 @@ if __name__ == "__main__":
     parser.add_argument('input_paths', nargs='+', help="Input file or directory paths")
     parser.add_argument('--output-dir', dest='output_dir', default=tempfile.mkdtemp(),
                         help="Output directory for extracted files (default: temp directory)")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Number of archives to extract concurrently (default: CPU count)")
     args = parser.parse_args()
 
-    main(args.input_paths, args.output_dir)
+    main(args.input_paths, args.output_dir, args.jobs)
@@ -5,48 +5,52 @@ import argparse
 import json
 import re
 from pathlib import Path
+try:
+    # Native JSON encoder that writes bytes directly
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
-parser = argparse.ArgumentParser(description='Parse ClamAV scan report and generate JSON summary')
-parser.add_argument('--report-path', default='clamav-reports/clamav-report.log',
-                    help='Path to ClamAV report file (default: clamav-reports/clamav-report.log)')
-args = parser.parse_args()
+# ClamAV reports a detection as "<path>: <signature> FOUND"
+INFECTION_PATTERN = re.compile(rb'(.*): (.+) FOUND\s*$')
 
-report_file = Path(args.report_path)
-if report_file.exists():
-    content = report_file.read_text(encoding='utf-8')
 
-    # Parse the summary line
+def parse_report(report_file: Path) -> dict:
+    """Summarise a ClamAV log in a single pass over its lines."""
+    # Stream the log line by line; only the summary counters and FOUND lines are kept in memory
+    # (sharded scans produce one summary per shard, so sum them)
     infected = 0
     scanned = 0
-
-    if "Infected files:" in content:
-        match = re.search(r'Infected files: (\d+)', content)
-        if match:
-            infected = int(match.group(1))
-
-    if "Scanned files:" in content:
-        match = re.search(r'Scanned files: (\d+)', content)
-        if match:
-            scanned = int(match.group(1))
-
-    # Find infected file details
     infected_files = []
-    for line in content.split('\n'):
-        if 'FOUND' in line:
-            infected_files.append(line.strip())
 
     results = []
-    for line in infected_files:
-        if ' FOUND ' in line:
-            parts = line.split(' FOUND ', 1)
-            if len(parts) == 2:
+
+    # Read bytes and decode only the FOUND lines: file names in the log are not guaranteed to be UTF-8
+    with report_file.open('rb') as report:
+        for line in report:
+            # Only FOUND lines can match; a substring test skips the backtracking regex for the rest
+            infection = INFECTION_PATTERN.match(line) if b' FOUND' in line else None
+            if infection:
+                infected_files.append(line.decode('utf-8', errors='replace').strip())
                 results.append({
-                    "file": parts[0].strip(),
-                    "infection": parts[1].strip(),
+                    "file": infection.group(1).decode('utf-8', errors='replace'),
+                    "infection": infection.group(2).decode('utf-8', errors='replace'),
                     "status": "infected"
                 })
+                continue
+            # Fixed prefixes: a bytes comparison is cheaper than a regex match per line.
+            # A partially written shard log can end mid-line, so counts that are missing are skipped
+            if line.startswith(b'Infected files: '):
+                count = line[16:].split()
+                if count and count[0].isdigit():
+                    infected += int(count[0])
+            elif line.startswith(b'Scanned files: '):
+                count = line[15:].split()
+                if count and count[0].isdigit():
+                    scanned += int(count[0])
 
-    json_data = {
+    return {
         "total_files": scanned,
         "infected_files": infected,
         "clean_files": scanned - infected,
@@ -54,9 +58,32 @@ if report_file.exists():
         "results": results
     }
 
+
+def write_json(json_data: dict, json_path: Path) -> None:
+    """Write the summary as indented JSON."""
+    if HAS_ORJSON:
+        json_path.write_bytes(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+    else:
+        with json_path.open('w', encoding='utf-8') as json_file:
+            json.dump(json_data, json_file, indent=2)
+
+
+def main(report_path: str) -> None:
+    """Parse the report and write its JSON summary next to it."""
+    report_file = Path(report_path)
+    if not report_file.exists():
+        print(f"⚠️  No scan report found at: {report_file}")
+        return
+
+    json_data = parse_report(report_file)
     # Write JSON to same directory as report file
-    json_path = report_file.parent / f"{report_file.stem}.json"
-    json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
-    print(f"✅ Scan complete: {scanned} files scanned, {infected} infected")
-else:
-    print(f"⚠️  No scan report found at: {report_file}")
+    write_json(json_data, report_file.parent / f"{report_file.stem}.json")
+    print(f"✅ Scan complete: {json_data['total_files']} files scanned, {json_data['infected_files']} infected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Parse ClamAV scan report and generate JSON summary')
+    parser.add_argument('--report-path', default='clamav-reports/clamav-report.log',
+                        help='Path to ClamAV report file (default: clamav-reports/clamav-report.log)')
+    args = parser.parse_args()
+    main(args.report_path)
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Shared test setup: load the hyphenated scripts under importable module names.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent.parent
+
+# Module name -> script file; loaded once per interpreter and shared by every test module
+SCRIPTS = {
+    "extract_archives": "extract-archives.py",
+    "parse_clamav_report": "parse-clamav-report.py",
+}
+
+for module_name, file_name in SCRIPTS.items():
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / file_name)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
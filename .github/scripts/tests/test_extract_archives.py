@@ -3,44 +3,103 @@
 Comprehensive test suite for extract-archives.py with 100% coverage.
 """
 
+import io
 import json
+import hashlib
 import os
 import shutil
+import subprocess
 import tarfile
 import tempfile
 import zipfile
 import gzip
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
 import pytest
 
-# Import the modules to test
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-import importlib.util
-spec = importlib.util.spec_from_file_location("extract_archives", Path(__file__).parent.parent / "extract-archives.py")
-extract_archives = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(extract_archives)
+# Loaded once by conftest.py
+import extract_archives
 
 ArchiveExtractor = extract_archives.ArchiveExtractor
 main = extract_archives.main
 
 
+def _fake_libarchive(entries):
+    """Build a stand-in for the libarchive module whose reader yields the given entries."""
+    fake = Mock()
+    fake.ArchiveError = type('ArchiveError', (Exception,), {})
+    reader = MagicMock()
+    reader.__enter__.return_value = iter(entries)
+    fake.file_reader.return_value = reader
+    return fake
+
+
+def _archive_entry(pathname, blocks=(), isdir=False, isreg=True):
+    """Build a libarchive entry stand-in with only the attributes the extractor reads."""
+    return SimpleNamespace(pathname=pathname, isdir=isdir, isreg=isreg, get_blocks=lambda: iter(blocks))
+
+
+def _add_tar_member(tar, name, data):
+    """Add an in-memory regular file to an open tar archive."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+# Canonical archives are built once per session; tests only read them
+@pytest.fixture(scope="session")
+def archive_dir(tmp_path_factory):
+    """Directory holding the shared sample archives."""
+    return tmp_path_factory.mktemp("archives")
+
+
+@pytest.fixture(scope="session")
+def sample_tar(archive_dir):
+    """A tar archive containing test.txt."""
+    tar_path = archive_dir / "test.tar"
+    with tarfile.open(tar_path, 'w') as tar:
+        _add_tar_member(tar, "test.txt", b"test content")
+    return tar_path
+
+
+@pytest.fixture(scope="session")
+def sample_zip(archive_dir):
+    """A zip archive containing test.txt."""
+    zip_path = archive_dir / "test.zip"
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        zf.writestr("test.txt", "test content")
+    return zip_path
+
+
+@pytest.fixture(scope="session")
+def sample_gz(archive_dir):
+    """A gzip-compressed test.txt."""
+    gz_path = archive_dir / "test.txt.gz"
+    with gzip.open(gz_path, 'wb') as f:
+        f.write(b"test content")
+    return gz_path
+
+
+@pytest.fixture(scope="session")
+def nested_tar(archive_dir):
+    """A tar archive containing inner.tar, which contains inner.txt."""
+    inner = io.BytesIO()
+    with tarfile.open(fileobj=inner, mode='w') as tar:
+        _add_tar_member(tar, "inner.txt", b"inner content")
+    outer_tar = archive_dir / "outer.tar"
+    with tarfile.open(outer_tar, 'w') as tar:
+        _add_tar_member(tar, "inner.tar", inner.getvalue())
+    return outer_tar
+
+
 class TestArchiveExtractor:
     """Test cases for ArchiveExtractor class."""
 
     @pytest.fixture
-    def temp_dir(self):
-        """Create a temporary directory for testing."""
-        temp_dir = Path(tempfile.mkdtemp())
-        yield temp_dir
-        shutil.rmtree(temp_dir)
-
-    @pytest.fixture
-    def extractor(self, temp_dir):
+    def extractor(self, tmp_path):
         """Create an ArchiveExtractor instance."""
-        return ArchiveExtractor(str(temp_dir / "output"))
+        return ArchiveExtractor(str(tmp_path / "output"))
 
     def test_init_default(self):
         """Test ArchiveExtractor initialization with default output dir."""
@@ -49,97 +108,99 @@ class TestArchiveExtractor:
         assert extractor.extracted_paths == []
         assert extractor.errors == []
 
-    def test_init_custom_output(self, temp_dir):
+    def test_init_custom_output(self, tmp_path):
         """Test ArchiveExtractor initialization with custom output dir."""
-        output_dir = temp_dir / "custom_output"
+        output_dir = tmp_path / "custom_output"
         extractor = ArchiveExtractor(str(output_dir))
         assert extractor.output_dir == output_dir
         assert extractor.extracted_paths == []
         assert extractor.errors == []
 
-    def test_init_with_base_path(self, temp_dir):
+    def test_init_with_base_path(self, tmp_path):
         """Test ArchiveExtractor initialization with base path for exclusions."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
-        assert extractor.output_dir == temp_dir / "output"
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
+        assert extractor.output_dir == tmp_path / "output"
         assert extractor.extracted_paths == []
         assert extractor.errors == []
         assert '.git' in extractor.exclude_dirs
 
-    def test_is_archive_supported_formats(self):
+    @pytest.mark.parametrize("file_path,expected", [
+        (Path("test.tar"), True),
+        (Path("test.tgz"), True),
+        (Path("test.tar.gz"), True),
+        (Path("test.tar.bz2"), True),
+        (Path("test.tar.xz"), True),
+        (Path("test.zip"), True),
+        (Path("test.rar"), True),
+        (Path("test.gz"), True),
+        (Path("test.7z"), True),
+        (Path("test.tar.zst"), True),
+        (Path("test.cpio"), True),
+        (Path("test.txt"), False),
+        (Path("test.xz"), False),
+        (Path(".gz"), False),
+        (Path("test"), False),
+    ])
+    def test_is_archive_supported_formats(self, extractor, file_path, expected):
         """Test is_archive method with supported formats."""
-        extractor = ArchiveExtractor()
-        test_cases = [
-            (Path("test.tar"), True),
-            (Path("test.tgz"), True),
-            (Path("test.tar.gz"), True),
-            (Path("test.zip"), True),
-            (Path("test.rar"), True),
-            (Path("test.gz"), True),
-            (Path("test.txt"), False),
-            (Path("test"), False),
-        ]
-
-        for file_path, expected in test_cases:
-            assert extractor.is_archive(file_path) == expected
+        assert extractor.is_archive(file_path) == expected
 
-    def test_is_archive_case_insensitive(self):
+    @pytest.mark.parametrize("file_path", [Path("test.TAR"), Path("test.ZIP"), Path("test.TAR.GZ")])
+    def test_is_archive_case_insensitive(self, extractor, file_path):
         """Test is_archive method is case insensitive."""
-        extractor = ArchiveExtractor()
-        assert extractor.is_archive(Path("test.TAR"))
-        assert extractor.is_archive(Path("test.ZIP"))
-        assert extractor.is_archive(Path("test.TAR.GZ"))
+        assert extractor.is_archive(file_path)
 
-    def test_load_ignore_files_gitignore(self, temp_dir):
+    def test_load_ignore_files_gitignore(self, tmp_path):
         """Test loading patterns from .gitignore file."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
         gitignore = base_path / ".gitignore"
         gitignore.write_text("node_modules\n*.log\n# comment\n")
 
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
         assert "node_modules" in extractor.exclude_patterns
         assert "*.log" in extractor.exclude_patterns
         assert "# comment" not in extractor.exclude_patterns
 
-    def test_load_ignore_files_dockerignore(self, temp_dir):
+    def test_load_ignore_files_dockerignore(self, tmp_path):
         """Test loading patterns from .dockerignore file."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
         dockerignore = base_path / ".dockerignore"
         dockerignore.write_text("Dockerfile\ntmp/\n")
 
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
         assert "Dockerfile" in extractor.exclude_patterns
         assert "tmp" in extractor.exclude_patterns
 
-    def test_load_ignore_files_missing_file(self, temp_dir):
+    def test_load_ignore_files_missing_file(self, tmp_path):
         """Test loading ignore files when file doesn't exist."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
 
         # Should not raise exception
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
         assert len(extractor.exclude_patterns) == 0
 
-    def test_should_exclude_directory(self, temp_dir):
+    def test_should_exclude_directory(self, tmp_path):
         """Test _should_exclude with excluded directory."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
 
         excluded_path = base_path / "node_modules" / "package.json"
         assert extractor._should_exclude(excluded_path, base_path) == True
 
-    def test_should_exclude_pattern_match(self, temp_dir):
+    def test_should_exclude_pattern_match(self, tmp_path):
         """Test _should_exclude with pattern from ignore file."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
         gitignore = base_path / ".gitignore"
         gitignore.write_text("debug.log\ntest.txt\n")
 
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
 
         log_file = base_path / "debug.log"
         assert extractor._should_exclude(log_file, base_path) == True
@@ -150,77 +211,214 @@ class TestArchiveExtractor:
         normal_file = base_path / "script.py"
         assert extractor._should_exclude(normal_file, base_path) == False
 
-    def test_should_exclude_not_excluded(self, temp_dir):
+    def test_should_exclude_fallback_pattern(self, tmp_path):
+        """Test the single-regex fallback: plain patterns as substrings, globs per path component."""
+        base_path = tmp_path / "base"
+        base_path.mkdir()
+        (base_path / ".gitignore").write_text("*.log\n/build/\ncache\nrelease-?.zip\n")
+
+        with patch.object(extract_archives, 'HAS_PATHSPEC', False):
+            extractor = ArchiveExtractor(base_path=base_path)
+
+        assert extractor._should_exclude(base_path / "app" / "build" / "app.zip", base_path) is True
+        assert extractor._should_exclude(base_path / "pycache_dir" / "a.zip", base_path) is True
+        assert extractor._should_exclude(base_path / "sub" / "debug.log", base_path) is True
+        assert extractor._should_exclude(base_path / "logs.log" / "a.zip", base_path) is True
+        assert extractor._should_exclude(base_path / "release-1.zip", base_path) is True
+        assert extractor._should_exclude(base_path / "release-10.zip", base_path) is False
+        assert extractor._should_exclude(base_path / "debug.log.zip", base_path) is False
+
+    def test_should_exclude_uses_pathspec(self, tmp_path):
+        """Test _should_exclude delegates to the compiled ignore spec when pathspec is available."""
+        base_path = tmp_path / "base"
+        base_path.mkdir()
+        (base_path / ".gitignore").write_text("/build\n*.log\n")
+        fake_pathspec = Mock()
+        fake_pathspec.PathSpec.from_lines.return_value.match_file.side_effect = lambda p: p.endswith(".log")
+
+        with patch.object(extract_archives, 'HAS_PATHSPEC', True), \
+                patch.object(extract_archives, 'pathspec', fake_pathspec, create=True):
+            extractor = ArchiveExtractor(base_path=base_path)
+
+        fake_pathspec.PathSpec.from_lines.assert_called_once_with('gitwildmatch', ["/build", "*.log"])
+        assert extractor._should_exclude(base_path / "debug.log", base_path) is True
+        assert extractor._should_exclude(base_path / "main.py", base_path) is False
+
+    @pytest.mark.skipif(not extract_archives.HAS_PATHSPEC, reason="pathspec not available")
+    def test_should_exclude_gitwildmatch(self, tmp_path):
+        """Test gitignore semantics through the real pathspec library."""
+        base_path = tmp_path / "base"
+        base_path.mkdir()
+        (base_path / ".gitignore").write_text("*.log\n/build/\n")
+        extractor = ArchiveExtractor(base_path=base_path)
+
+        assert extractor._should_exclude(base_path / "sub" / "debug.log", base_path) is True
+        assert extractor._should_exclude(base_path / "build" / "app.zip", base_path) is True
+        assert extractor._should_exclude(base_path / "sub" / "build" / "app.zip", base_path) is False
+        assert extractor._should_exclude(base_path / "catalog.txt", base_path) is False
+
+    def test_should_exclude_not_excluded(self, tmp_path):
         """Test _should_exclude with non-excluded path."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
 
         normal_file = base_path / "script.py"
         assert extractor._should_exclude(normal_file, base_path) == False
 
     @patch.object(extract_archives, 'logger')
-    def test_extract_archive_unsupported_format(self, mock_logger, extractor, temp_dir):
+    def test_extract_archive_unsupported_format(self, mock_logger, extractor, tmp_path):
         """Test extract_archive with unsupported format."""
-        unsupported_file = temp_dir / "test.txt"
+        unsupported_file = tmp_path / "test.txt"
         unsupported_file.write_text("test content")
 
-        result = extractor.extract_archive(unsupported_file, temp_dir / "extract")
+        result = extractor.extract_archive(unsupported_file, tmp_path / "extract")
         assert result is False
         mock_logger.warning.assert_called_once()
 
-    def test_extract_archive_tar_format(self, extractor, temp_dir):
-        """Test extract_archive with tar format."""
-        # Create a test tar file
-        tar_path = temp_dir / "test.tar"
-        extract_dir = temp_dir / "extract"
+    @pytest.mark.parametrize("archive", ["sample_tar", "sample_zip", "sample_gz"])
+    def test_extract_archive_format(self, extractor, tmp_path, request, archive):
+        """Test extract_archive with each basic format."""
+        extract_dir = tmp_path / "extract"
         extract_dir.mkdir()  # Ensure directory exists
 
-        with tarfile.open(tar_path, 'w') as tar:
-            # Add a test file
-            test_file = temp_dir / "test.txt"
+        result = extractor.extract_archive(request.getfixturevalue(archive), extract_dir)
+        assert result is True
+        assert (extract_dir / "test.txt").exists()
+
+    @pytest.mark.parametrize("name,mode", [("test.tar.gz", "w:gz"), ("test.tar.bz2", "w:bz2"), ("test.tar.xz", "w:xz")])
+    def test_extract_archive_compressed_tar_format(self, extractor, tmp_path, name, mode):
+        """Test extract_archive unpacks compressed tars instead of only decompressing them."""
+        tar_path = tmp_path / name
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with tarfile.open(tar_path, mode) as tar:
+            test_file = tmp_path / "test.txt"
             test_file.write_text("test content")
             tar.add(str(test_file), arcname="test.txt")
 
         result = extractor.extract_archive(tar_path, extract_dir)
         assert result is True
-        assert (extract_dir / "test.txt").exists()
+        assert (extract_dir / "test.txt").read_text() == "test content"
 
-    def test_extract_archive_zip_format(self, extractor, temp_dir):
-        """Test extract_archive with zip format."""
-        # Create a test zip file
-        zip_path = temp_dir / "test.zip"
-        extract_dir = temp_dir / "extract"
-        extract_dir.mkdir()  # Ensure directory exists
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'XZ_PATH', None)
+    def test_extract_tar_xz_without_xz_command(self, extractor, tmp_path):
+        """Test .tar.xz archives fall back to the lzma module when the xz command is missing."""
+        tar_path = tmp_path / "test.tar.xz"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
 
-        with zipfile.ZipFile(zip_path, 'w') as zf:
-            zf.writestr("test.txt", "test content")
+        with tarfile.open(tar_path, 'w:xz') as tar:
+            tar.addfile(tarfile.TarInfo("empty.txt"))
 
-        result = extractor.extract_archive(zip_path, extract_dir)
-        assert result is True
-        assert (extract_dir / "test.txt").exists()
+        assert extractor._extract_tar(tar_path, extract_dir) is True
+        assert (extract_dir / "empty.txt").exists()
 
-    def test_extract_archive_gz_format(self, extractor, temp_dir):
-        """Test extract_archive with gz format."""
-        # Create a test gz file
-        gz_path = temp_dir / "test.txt.gz"
-        extract_dir = temp_dir / "extract"
-        extract_dir.mkdir()  # Ensure directory exists
+    @pytest.mark.skipif(shutil.which("gzip") is None, reason="gzip command not available")
+    @patch.object(extract_archives, 'HAS_FAST_GZIP', False)
+    @patch.object(extract_archives, 'HAS_RAPIDGZIP', False)
+    def test_extract_tar_gz_pigz(self, extractor, tmp_path):
+        """Test .tar.gz archives are piped through pigz when no faster in-process inflater is installed."""
+        tar_path = tmp_path / "test.tar.gz"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
 
-        with gzip.open(gz_path, 'wb') as f:
-            f.write(b"test content")
+        with tarfile.open(tar_path, 'w:gz') as tar:
+            tar.addfile(tarfile.TarInfo("empty.txt"))
+
+        # gzip accepts the same arguments as pigz
+        with patch.object(extract_archives, 'PIGZ_PATH', shutil.which("gzip")), \
+                patch.object(extract_archives.subprocess, 'Popen', wraps=subprocess.Popen) as mock_popen:
+            assert extractor._extract_tar(tar_path, extract_dir) is True
+
+        assert mock_popen.call_args[0][0] == [shutil.which("gzip"), '--decompress', '--stdout', str(tar_path)]
+        assert (extract_dir / "empty.txt").exists()
+
+    @pytest.mark.skipif(shutil.which("gzip") is None, reason="gzip command not available")
+    @patch.object(extract_archives, 'HAS_FAST_GZIP', False)
+    @patch.object(extract_archives, 'HAS_RAPIDGZIP', False)
+    def test_extract_tar_piped_trailing_data(self, extractor, tmp_path):
+        """Test data after the end-of-archive marker, larger than a pipe buffer, cannot stall the decompressor."""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            _add_tar_member(tar, "test.txt", b"test content")
+        tar_path = tmp_path / "test.tar.gz"
+        with gzip.open(tar_path, 'wb') as f:
+            f.write(buffer.getvalue() + os.urandom(1024 * 1024))
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with patch.object(extract_archives, 'PIGZ_PATH', shutil.which("gzip")):
+            assert extractor._extract_tar(tar_path, extract_dir) is True
+
+        assert (extract_dir / "test.txt").read_text() == "test content"
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'HAS_FAST_GZIP', False)
+    @patch.object(extract_archives, 'HAS_RAPIDGZIP', False)
+    @patch.object(extract_archives, 'PIGZ_PATH', None)
+    @patch.object(extract_archives, 'XZ_PATH', '/usr/bin/xz')
+    def test_extract_tar_routes_on_content(self, extractor, tmp_path):
+        """Test a gzip tarball named .tar.xz is not handed to the xz command."""
+        tar_path = tmp_path / "test.tar.xz"
+        with tarfile.open(tar_path, 'w:gz') as tar:
+            _add_tar_member(tar, "test.txt", b"test content")
+        extract_dir = tmp_path / "extract"
+
+        with patch.object(extract_archives.subprocess, 'Popen') as mock_popen:
+            assert extractor.extract_archive(tar_path, extract_dir) is True
+
+        mock_popen.assert_not_called()
+        assert (extract_dir / "test.txt").read_text() == "test content"
+
+    @pytest.mark.skipif(extract_archives.XZ_PATH is None, reason="xz command not available")
+    @patch.object(extract_archives, 'logger')
+    def test_extract_tar_xz_corrupt(self, mock_logger, extractor, tmp_path):
+        """Test a corrupt .tar.xz fails cleanly when decompressed by the xz command."""
+        tar_path = tmp_path / "test.tar.xz"
+        tar_path.write_bytes(b"\xfd7zXZ\x00 definitely not xz data")
 
-        result = extractor.extract_archive(gz_path, extract_dir)
+        assert extractor._extract_tar(tar_path, tmp_path / "extract") is False
+        mock_logger.error.assert_called_once()
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    def test_extract_archive_mislabeled_zip(self, extractor, tmp_path):
+        """Test extract_archive picks the extractor from the magic number when the extension is wrong."""
+        archive_path = tmp_path / "test.tar"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with zipfile.ZipFile(archive_path, 'w') as zf:
+            zf.writestr("test.txt", "test content")
+
+        result = extractor.extract_archive(archive_path, extract_dir)
         assert result is True
-        assert (extract_dir / "test.txt").exists()
+        assert (extract_dir / "test.txt").read_text() == "test content"
 
+    def test_sniff_format(self, extractor, tmp_path):
+        """Test magic number detection for each supported format."""
+        samples = {
+            "a.zip": (b"PK\x03\x04rest", '_extract_zip'),
+            "a.rar": (b"Rar!\x1a\x07\x00", '_extract_rar'),
+            "a.gz": (b"\x1f\x8b\x08", '_extract_gz'),
+            "a.tar": (b"\x00" * 257 + b"ustar\x00", '_extract_tar'),
+            "a.txt": (b"plain text", None),
+        }
+        for name, (content, expected) in samples.items():
+            path = tmp_path / name
+            path.write_bytes(content)
+            assert extractor._sniff_format(path) == expected, name
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
     @patch.object(extract_archives, 'HAS_RARFILE', False)
     @patch.object(extract_archives, 'logger')
-    def test_extract_archive_rar_format_no_rarfile(self, mock_logger, extractor, temp_dir):
+    def test_extract_archive_rar_format_no_rarfile(self, mock_logger, extractor, tmp_path):
         """Test extract_archive with rar format when rarfile is not available."""
         # Create a dummy rar file
-        rar_path = temp_dir / "test.rar"
-        extract_dir = temp_dir / "extract"
+        rar_path = tmp_path / "test.rar"
+        extract_dir = tmp_path / "extract"
         extract_dir.mkdir()
 
         rar_path.write_bytes(b"dummy rar content")
@@ -231,126 +429,456 @@ class TestArchiveExtractor:
         mock_logger.warning.assert_called_once()
 
     @patch.object(extract_archives, 'logger')
-    def test_extract_archive_exception_handling(self, mock_logger, extractor, temp_dir):
+    def test_extract_archive_exception_handling(self, mock_logger, extractor, tmp_path, sample_zip):
         """Test extract_archive exception handling."""
-        # Create a zip file that will cause an exception
-        zip_path = temp_dir / "test.zip"
-        extract_dir = temp_dir / "extract"
+        extract_dir = tmp_path / "extract"
         extract_dir.mkdir()
 
-        with zipfile.ZipFile(zip_path, 'w') as zf:
-            zf.writestr("test.txt", "test content")
-
         # Patch _extract_zip to raise an exception
         with patch.object(extractor, '_extract_zip', side_effect=OSError("Test error")):
-            result = extractor.extract_archive(zip_path, extract_dir)
+            result = extractor.extract_archive(sample_zip, extract_dir)
             assert result is False
             mock_logger.error.assert_called_once()
             assert len(extractor.errors) > 0
 
-    def test_extract_tar_success(self, extractor, temp_dir):
-        """Test successful tar extraction."""
-        # Create a test tar file
-        tar_path = temp_dir / "test.tar"
-        extract_dir = temp_dir / "extract"
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'HAS_FAST_GZIP', False)
+    @pytest.mark.parametrize("method,archive", [
+        ("_extract_tar", "sample_tar"),
+        ("_extract_zip", "sample_zip"),
+        ("_extract_gz", "sample_gz"),
+    ])
+    def test_extract_format_success(self, extractor, tmp_path, request, method, archive):
+        """Test successful extraction by each format's built-in extractor."""
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
 
-        with tarfile.open(tar_path, 'w') as tar:
-            # Add a test file
-            test_file = temp_dir / "test.txt"
+        result = getattr(extractor, method)(request.getfixturevalue(archive), extract_dir)
+        assert result is True
+        assert (extract_dir / "test.txt").read_text() == "test content"
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'HAS_FAST_GZIP', False)
+    def test_extract_tar_bz2_stream_mode(self, extractor, tmp_path):
+        """Test compressed tar extraction in stream mode."""
+        tar_path = tmp_path / "test.tar.bz2"
+        extract_dir = tmp_path / "extract"
+
+        with tarfile.open(tar_path, 'w:bz2') as tar:
+            test_file = tmp_path / "test.txt"
             test_file.write_text("test content")
-            tar.add(str(test_file), arcname="test.txt")
+            tar.add(str(test_file), arcname="dir/test.txt")
 
         result = extractor._extract_tar(tar_path, extract_dir)
         assert result is True
-        assert (extract_dir / "test.txt").exists()
+        assert (extract_dir / "dir" / "test.txt").read_text() == "test content"
+
+    @pytest.mark.parametrize("mode,name,xz_path", [
+        ('w', "test.tar", None),
+        ('w:xz', "test.tar.xz", extract_archives.XZ_PATH),
+    ], ids=["tarfile", "xz-command"])
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'logger')
+    def test_extract_tar_skips_unsafe_member(self, mock_logger, extractor, tmp_path, mode, name, xz_path):
+        """Test an unsafe tar member is skipped without abandoning the members after it."""
+        if mode == 'w:xz' and xz_path is None:
+            pytest.skip("xz command not available")
+        tar_path = tmp_path / name
+        with tarfile.open(tar_path, mode) as tar:
+            _add_tar_member(tar, "../evil.txt", b"evil")
+            _add_tar_member(tar, "good.txt", b"test content")
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with patch.object(extract_archives, 'XZ_PATH', xz_path):
+            assert extractor._extract_tar(tar_path, extract_dir) is True
+
+        assert (extract_dir / "good.txt").read_text() == "test content"
+        assert not (tmp_path / "evil.txt").exists()
+        mock_logger.warning.assert_called_once()
+
+    def test_extract_tar_members_without_data_filter(self, extractor, tmp_path):
+        """Test tar member extraction on Python versions without PEP 706 filters."""
+        mock_tar = MagicMock()
+        with patch.object(extract_archives, 'tarfile', Mock(spec=[])):
+            extractor._extract_tar_members(mock_tar, tmp_path)
+        mock_tar.extractall.assert_called_once()
+        assert mock_tar.extractall.call_args.args == (tmp_path,)
+        assert 'filter' not in mock_tar.extractall.call_args.kwargs
+
+    @pytest.mark.parametrize("mode", ['w', 'w:gz'])
+    def test_extract_tar_skips_unscanned_members(self, extractor, tmp_path, mode):
+        """Test tar members below directories the scan prunes are never written."""
+        tar_path = tmp_path / "test.tar"
+        with tarfile.open(tar_path, mode) as tar:
+            for name in ("src/app.js", "node_modules/pkg/index.js", "src/.git/config"):
+                info = tarfile.TarInfo(name)
+                info.size = 4
+                tar.addfile(info, io.BytesIO(b"data"))
+
+        extract_dir = tmp_path / "extract"
+        with patch.object(extract_archives, 'HAS_LIBARCHIVE', False):
+            assert extractor._extract_tar(tar_path, extract_dir) is True
+
+        assert (extract_dir / "src" / "app.js").exists()
+        assert not (extract_dir / "node_modules").exists()
+        assert not (extract_dir / "src" / ".git").exists()
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    def test_extract_zip_skips_unscanned_members(self, extractor, tmp_path):
+        """Test zip members below directories the scan prunes are never written."""
+        zip_path = tmp_path / "test.zip"
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            zf.writestr("app/main.py", "print()")
+            zf.writestr("app/__pycache__/main.pyc", "bytecode")
+
+        extract_dir = tmp_path / "extract"
+        assert extractor._extract_zip(zip_path, extract_dir) is True
+
+        assert (extract_dir / "app" / "main.py").exists()
+        assert not (extract_dir / "app" / "__pycache__").exists()
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'HAS_FAST_GZIP', True)
+    def test_extract_tar_gz_fast_gzip(self, extractor, tmp_path):
+        """Test .tar.gz extraction streams through the fast gzip implementation."""
+        tar_path = tmp_path / "test.tar.gz"
+        extract_dir = tmp_path / "extract"
+
+        with tarfile.open(tar_path, 'w:gz') as tar:
+            test_file = tmp_path / "test.txt"
+            test_file.write_text("test content")
+            tar.add(str(test_file), arcname="test.txt")
+
+        with patch.object(extract_archives, 'fast_gzip', gzip, create=True):
+            result = extractor._extract_tar(tar_path, extract_dir)
+        assert result is True
         assert (extract_dir / "test.txt").read_text() == "test content"
 
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
     @patch.object(extract_archives, 'logger')
-    def test_extract_tar_failure(self, mock_logger, extractor, temp_dir):
+    def test_extract_tar_failure(self, mock_logger, extractor, tmp_path):
         """Test tar extraction failure."""
         # Create an invalid tar file
-        tar_path = temp_dir / "invalid.tar"
+        tar_path = tmp_path / "invalid.tar"
         tar_path.write_bytes(b"invalid tar content")
 
-        result = extractor._extract_tar(tar_path, temp_dir / "extract")
+        result = extractor._extract_tar(tar_path, tmp_path / "extract")
         assert result is False
         mock_logger.error.assert_called_once()
 
-    def test_extract_zip_success(self, extractor, temp_dir):
-        """Test successful zip extraction."""
-        zip_path = temp_dir / "test.zip"
-        extract_dir = temp_dir / "extract"
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'MMAP_THRESHOLD', 1)
+    def test_extract_tar_memory_mapped(self, extractor, tmp_path):
+        """Test tar extraction from a memory-mapped archive."""
+        tar_path = tmp_path / "test.tar"
+        extract_dir = tmp_path / "extract"
+
+        with tarfile.open(tar_path, 'w') as tar:
+            test_file = tmp_path / "test.txt"
+            test_file.write_text("test content")
+            tar.add(str(test_file), arcname="test.txt")
+
+        result = extractor._extract_tar(tar_path, extract_dir)
+        assert result is True
+        assert (extract_dir / "test.txt").read_text() == "test content"
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'PARALLEL_ZIP_THRESHOLD', 0)
+    def test_extract_zip_parallel_members(self, tmp_path):
+        """Test large zip archives have their members extracted on several threads."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"), max_workers=4)
+        zip_path = tmp_path / "test.zip"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for i in range(20):
+                zf.writestr(f"dir{i % 3}/file{i}.txt", f"content {i}" * 100)
+
+        assert extractor._extract_zip(zip_path, extract_dir) is True
+        for i in range(20):
+            assert (extract_dir / f"dir{i % 3}" / f"file{i}.txt").read_text() == f"content {i}" * 100
+
+    @pytest.mark.parametrize("active,workers", [(0, 8), (1, 8), (3, 2), (8, 1), (20, 1)])
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'PARALLEL_ZIP_THRESHOLD', 0)
+    def test_extract_zip_parallel_workers_shared(self, tmp_path, active, workers):
+        """Test the member pool gets only its share of max_workers while other archives extract."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"), max_workers=8)
+        extractor._active_extractions = active
+        zip_path = tmp_path / "test.zip"
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            zf.writestr("first.txt", "first")
+            zf.writestr("second.txt", "second")
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with patch.object(extract_archives, 'ThreadPoolExecutor', wraps=extract_archives.ThreadPoolExecutor) as pool:
+            assert extractor._extract_zip(zip_path, extract_dir) is True
+
+        pool.assert_called_once_with(max_workers=workers)
+        assert (extract_dir / "second.txt").read_text() == "second"
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'PARALLEL_ZIP_THRESHOLD', 0)
+    @patch.object(extract_archives, 'logger')
+    def test_extract_zip_parallel_member_failure(self, mock_logger, extractor, tmp_path):
+        """Test a member failing on a worker thread fails the whole zip extraction."""
+        zip_path = tmp_path / "test.zip"
+        extract_dir = tmp_path / "extract"
+        (extract_dir / "clash").mkdir(parents=True)
+
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            zf.writestr("clash", "cannot overwrite a directory")
+            zf.writestr("ok.txt", "fine")
+
+        assert extractor._extract_zip(zip_path, extract_dir) is False
+        mock_logger.error.assert_called_once()
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'logger')
+    def test_extract_zip_directories_and_unsafe_members(self, mock_logger, extractor, tmp_path):
+        """Test zip extraction creates directory members and skips members escaping the target."""
+        zip_path = tmp_path / "test.zip"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
 
-        with zipfile.ZipFile(zip_path, 'w') as zip_file:
-            zip_file.writestr("test.txt", "test content")
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            zf.writestr("empty/", "")
+            zf.writestr("nested/test.txt", "test content")
+            zf.writestr("../escaped.txt", "escaped")
 
         result = extractor._extract_zip(zip_path, extract_dir)
         assert result is True
-        assert (extract_dir / "test.txt").exists()
-        assert (extract_dir / "test.txt").read_text() == "test content"
+        assert (extract_dir / "empty").is_dir()
+        assert (extract_dir / "nested" / "test.txt").read_text() == "test content"
+        assert not (tmp_path / "escaped.txt").exists()
+        mock_logger.warning.assert_called_once()
 
     @patch.object(extract_archives, 'logger')
-    def test_extract_zip_failure(self, mock_logger, extractor, temp_dir):
+    def test_extract_zip_failure(self, mock_logger, extractor, tmp_path):
         """Test zip extraction failure."""
-        zip_path = temp_dir / "invalid.zip"
+        zip_path = tmp_path / "invalid.zip"
         zip_path.write_bytes(b"invalid zip content")
 
-        result = extractor._extract_zip(zip_path, temp_dir / "extract")
+        result = extractor._extract_zip(zip_path, tmp_path / "extract")
         assert result is False
         mock_logger.error.assert_called_once()
 
-    def test_extract_gz_success(self, extractor, temp_dir):
-        """Test successful gz extraction."""
-        gz_path = temp_dir / "test.txt.gz"
-        extract_dir = temp_dir / "extract"
-        extract_dir.mkdir(exist_ok=True)  # Ensure extract dir exists
+    def test_copy_stream_reuses_buffer(self):
+        """Test _copy_stream copies exactly and keeps one buffer per thread."""
+        data = os.urandom(extract_archives.COPY_BUFFER_SIZE + 123)
+        first, second = io.BytesIO(), io.BytesIO()
+
+        extract_archives._copy_stream(io.BytesIO(data), first)
+        buffer = extract_archives._copy_buffers.view
+        extract_archives._copy_stream(io.BytesIO(data), second)
+
+        assert first.getvalue() == data
+        assert second.getvalue() == data
+        assert extract_archives._copy_buffers.view is buffer
+
+    def test_extract_gz_containing_tar(self, extractor, tmp_path):
+        """Test a gzip file holding a tarball is unpacked as a tar instead of written out whole."""
+        gz_path = tmp_path / "backup.gz"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("test content")
+        with tarfile.open(gz_path, 'w:gz') as tar:
+            tar.add(str(test_file), arcname="test.txt")
+
+        assert extractor._extract_gz(gz_path, extract_dir) is True
+        assert (extract_dir / "test.txt").read_text() == "test content"
+        assert not (extract_dir / "backup").exists()
+
+    @patch.object(extract_archives, 'HAS_RAPIDGZIP', True)
+    @patch.object(extract_archives, 'PARALLEL_GZIP_THRESHOLD', 1)
+    def test_extract_gz_parallel(self, extractor, tmp_path):
+        """Test large gz files are decoded through rapidgzip when it is installed."""
+        gz_path = tmp_path / "test.txt.gz"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
 
-        # Create a gzipped file
         with gzip.open(gz_path, 'wt') as f:
             f.write("test content")
 
+        fake_rapidgzip = Mock()
+        fake_rapidgzip.open.side_effect = lambda path, parallelization: gzip.open(path, 'rb')
+        with patch.object(extract_archives, 'rapidgzip', fake_rapidgzip, create=True):
+            assert extractor._extract_gz(gz_path, extract_dir) is True
+
+        fake_rapidgzip.open.assert_called_once_with(str(gz_path), parallelization=os.cpu_count())
+        assert (extract_dir / "test.txt").read_text() == "test content"
+
+    @patch.object(extract_archives, 'HAS_FAST_GZIP', False)
+    @patch.object(extract_archives, 'COPY_BUFFER_SIZE', 4)
+    def test_extract_gz_multiple_chunks(self, extractor, tmp_path):
+        """Test gz extraction reassembles output copied through a small buffer."""
+        gz_path = tmp_path / "test.txt.gz"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with gzip.open(gz_path, 'wt') as f:
+            f.write("content spanning several buffers")
+
+        assert extractor._extract_gz(gz_path, extract_dir) is True
+        assert (extract_dir / "test.txt").read_text() == "content spanning several buffers"
+
+    @pytest.mark.skipif(not extract_archives.HAS_FAST_GZIP, reason="isal/zlib-ng not available")
+    def test_extract_gz_fast_gzip(self, extractor, tmp_path):
+        """Test gz extraction through the installed fast gzip implementation."""
+        gz_path = tmp_path / "test.txt.gz"
+        extract_dir = tmp_path / "extract"
+        extract_dir.mkdir()
+
+        with gzip.open(gz_path, 'wb') as f:
+            f.write(b"test content")
+
         result = extractor._extract_gz(gz_path, extract_dir)
         assert result is True
-        assert (extract_dir / "test.txt").exists()
-        assert (extract_dir / "test.txt").read_text() == "test content"
+        assert (extract_dir / "test.txt").read_bytes() == b"test content"
+
+    @pytest.mark.skipif(not extract_archives.HAS_LIBARCHIVE, reason="libarchive not available")
+    def test_extract_libarchive_success(self, extractor, tmp_path):
+        """Test successful extraction through the real libarchive library."""
+        tar_path = tmp_path / "test.tar.gz"
+        extract_dir = tmp_path / "extract"
+
+        with tarfile.open(tar_path, 'w:gz') as tar:
+            test_file = tmp_path / "test.txt"
+            test_file.write_text("test content")
+            tar.add(str(test_file), arcname="nested/test.txt")
+
+        result = extractor._extract_libarchive(tar_path, extract_dir)
+        assert result is True
+        assert (extract_dir / "nested" / "test.txt").read_text() == "test content"
 
     @patch.object(extract_archives, 'logger')
-    def test_extract_gz_failure(self, mock_logger, extractor, temp_dir):
+    def test_extract_libarchive_entries(self, mock_logger, extractor, tmp_path):
+        """Test libarchive extraction writes files and directories and skips unsafe members."""
+        entries = [
+            _archive_entry("subdir", isdir=True, isreg=False),
+            _archive_entry("subdir/test.txt", [b"test ", b"content"]),
+            _archive_entry("second.txt", [b"second"]),
+            _archive_entry("link", isreg=False),
+            _archive_entry("../escaped.txt"),
+        ]
+        fake_libarchive = _fake_libarchive(entries)
+        extract_dir = tmp_path / "extract"
+
+        with patch.object(extract_archives, 'libarchive', fake_libarchive, create=True):
+            result = extractor._extract_libarchive(tmp_path / "test.zip", extract_dir)
+
+        assert result is True
+        assert (extract_dir / "subdir" / "test.txt").read_text() == "test content"
+        assert (extract_dir / "second.txt").read_text() == "second"
+        assert not (extract_dir / "link").exists()
+        assert not (tmp_path / "escaped.txt").exists()
+        mock_logger.warning.assert_called_once()
+
+    @patch.object(extract_archives, 'logger')
+    @patch.object(extract_archives, 'WRITE_QUEUE_SIZE', 1)
+    def test_extract_libarchive_write_failure(self, mock_logger, extractor, tmp_path):
+        """Test a write error in the writer thread fails extraction without stalling the reader."""
+        extract_dir = tmp_path / "extract"
+        (extract_dir / "clash").mkdir(parents=True)
+        entries = [
+            _archive_entry("clash", [b"a", b"b", b"c"]),
+            _archive_entry("after.txt", [b"d", b"e"]),
+        ]
+
+        with patch.object(extract_archives, 'libarchive', _fake_libarchive(entries), create=True):
+            result = extractor._extract_libarchive(tmp_path / "test.zip", extract_dir)
+
+        assert result is False
+        mock_logger.error.assert_called_once()
+
+    @patch.object(extract_archives, 'logger')
+    def test_extract_libarchive_failure(self, mock_logger, extractor, tmp_path):
+        """Test libarchive extraction failure."""
+        fake_libarchive = _fake_libarchive([])
+        fake_libarchive.file_reader.side_effect = fake_libarchive.ArchiveError("Damaged archive")
+
+        with patch.object(extract_archives, 'libarchive', fake_libarchive, create=True):
+            result = extractor._extract_libarchive(tmp_path / "invalid.zip", tmp_path / "extract")
+
+        assert result is False
+        mock_logger.error.assert_called_once()
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'logger')
+    def test_extract_libarchive_only_without_libarchive(self, mock_logger, extractor, tmp_path):
+        """Test 7z and similar formats are skipped with a warning when libarchive is missing."""
+        archive_path = tmp_path / "test.7z"
+        archive_path.write_bytes(b"7z\xbc\xaf\x27\x1c")
+
+        result = extractor.extract_archive(archive_path, tmp_path / "extract")
+        assert result is False
+        mock_logger.warning.assert_called_once_with(
+            "libarchive not available, skipping extraction: %s", archive_path)
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', True)
+    def test_extract_libarchive_only_formats(self, extractor, tmp_path):
+        """Test 7z, zstd-compressed tar and cpio archives are extracted through libarchive."""
+        with patch.object(extractor, '_extract_libarchive', return_value=True) as mock_extract:
+            for name in ("test.7z", "test.tar.zst", "test.cpio"):
+                archive_path = tmp_path / name
+                archive_path.write_bytes(b"")
+                assert extractor.extract_archive(archive_path, tmp_path) is True
+
+        assert mock_extract.call_count == 3
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', True)
+    def test_extract_tar_zip_rar_prefer_libarchive(self, extractor, tmp_path):
+        """Test tar, zip and rar extraction delegate to libarchive when it is available."""
+        # The tar header is read to pick an external decompressor first
+        (tmp_path / "test.tar").write_bytes(b"")
+        with patch.object(extractor, '_extract_libarchive', return_value=True) as mock_extract:
+            assert extractor._extract_tar(tmp_path / "test.tar", tmp_path) is True
+            assert extractor._extract_zip(tmp_path / "test.zip", tmp_path) is True
+            assert extractor._extract_rar(tmp_path / "test.rar", tmp_path) is True
+        assert mock_extract.call_count == 3
+
+    @patch.object(extract_archives, 'logger')
+    def test_extract_gz_failure(self, mock_logger, extractor, tmp_path):
         """Test gz extraction failure."""
-        gz_path = temp_dir / "invalid.gz"
+        gz_path = tmp_path / "invalid.gz"
         gz_path.write_bytes(b"invalid gz content")
 
-        result = extractor._extract_gz(gz_path, temp_dir / "extract")
+        result = extractor._extract_gz(gz_path, tmp_path / "extract")
         assert result is False
         mock_logger.error.assert_called_once()
 
-    def test_extract_recursively_file_non_archive(self, extractor, temp_dir):
+    def test_extract_recursively_file_non_archive(self, extractor, tmp_path):
         """Test extract_recursively with a non-archive file."""
-        test_file = temp_dir / "test.txt"
+        test_file = tmp_path / "test.txt"
         test_file.write_text("test content")
 
         result = extractor.extract_recursively(test_file)
         assert len(result) == 0  # Non-archive files are not copied
         assert len(extractor.extracted_paths) == 0
 
-    def test_extract_recursively_creates_output_dir(self, temp_dir):
+    def test_extract_recursively_creates_output_dir(self, tmp_path):
         """Test that extract_recursively creates output directory when it doesn't exist."""
         # Create extractor with non-existent output dir
-        nonexistent_output = temp_dir / "nonexistent_output"
+        nonexistent_output = tmp_path / "nonexistent_output"
         assert not nonexistent_output.exists()
 
         extractor = ArchiveExtractor(str(nonexistent_output))
-        test_file = temp_dir / "test.txt"
+        test_file = tmp_path / "test.txt"
         test_file.write_text("test content")
 
         result = extractor.extract_recursively(test_file)
         assert len(result) == 0
         assert nonexistent_output.exists()  # Should be created
 
-    def test_extract_recursively_directory(self, extractor, temp_dir):
+    def test_extract_recursively_directory(self, extractor, tmp_path):
         """Test extract_recursively with a directory."""
         # Create test directory structure
-        test_dir = temp_dir / "test_dir"
+        test_dir = tmp_path / "test_dir"
         test_dir.mkdir()
         (test_dir / "file1.txt").write_text("content1")
         (test_dir / "file2.txt").write_text("content2")
@@ -359,40 +887,258 @@ class TestArchiveExtractor:
         assert len(result) == 0  # No archives to extract
         assert len(extractor.extracted_paths) == 0
 
-    def test_extract_recursively_with_archive(self, extractor, temp_dir):
+    def test_extract_recursively_with_archive(self, extractor, sample_zip):
         """Test extract_recursively with an archive file."""
-        # Create a test zip file
-        zip_path = temp_dir / "test.zip"
-        with zipfile.ZipFile(zip_path, 'w') as zf:
-            zf.writestr("test.txt", "test content")
-
-        result = extractor.extract_recursively(zip_path)
+        result = extractor.extract_recursively(sample_zip)
         assert len(result) == 1
         assert len(extractor.extracted_paths) == 1
         assert result[0].exists()
         assert (result[0] / "test.txt").exists()
 
-    def test_extract_recursively_nested_archives(self, extractor, temp_dir):
+    def test_extract_recursively_nested_archives(self, extractor, nested_tar):
         """Test extract_recursively with nested archives."""
-        # Create a tar file containing another tar file
-        inner_tar = temp_dir / "inner.tar"
-        with tarfile.open(inner_tar, 'w') as tar:
-            test_file = temp_dir / "inner.txt"
-            test_file.write_text("inner content")
-            tar.add(str(test_file), arcname="inner.txt")
+        result = extractor.extract_recursively(nested_tar)
+        assert len(result) == 2  # Outer tar plus the inner tar found inside it
+        assert any((path / "inner.txt").exists() for path in result)
+
+    def test_extract_recursively_directory_with_archives(self, tmp_path):
+        """Test extract_recursively extracts every archive in a directory tree."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"), max_workers=2)
+        test_dir = tmp_path / "test_dir"
+        (test_dir / "sub").mkdir(parents=True)
+        (test_dir / "node_modules").mkdir()
+
+        for zip_path in (test_dir / "a.zip", test_dir / "sub" / "b.zip", test_dir / "node_modules" / "c.zip"):
+            with zipfile.ZipFile(zip_path, 'w') as zf:
+                zf.writestr(f"{zip_path.stem}.txt", "content")
+        (test_dir / "readme.txt").write_text("not an archive")
 
-        outer_tar = temp_dir / "outer.tar"
-        with tarfile.open(outer_tar, 'w') as tar:
-            tar.add(str(inner_tar), arcname="inner.tar")
+        result = extractor.extract_recursively(test_dir)
+        assert len(result) == 2  # node_modules is excluded
+        extracted = {item.name for path in result for item in path.iterdir()}
+        assert extracted == {"a.txt", "b.txt"}
+
+    def test_find_archives_prunes_excluded_directories(self, tmp_path):
+        """Test excluded directories are pruned from the walk rather than filtered per file."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"))
+        (tmp_path / "src").mkdir()
+        (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+        (tmp_path / "node_modules" / "pkg" / "dep.zip").write_bytes(b"")
+        (tmp_path / "src" / "app.zip").write_bytes(b"")
+
+        visited = []
+        real_scandir = os.scandir
+
+        def recording_scandir(path):
+            visited.append(Path(path).name)
+            return real_scandir(path)
+
+        with patch.object(extract_archives.os, 'scandir', side_effect=recording_scandir):
+            archives = extractor._find_archives(tmp_path)
+
+        assert archives == [tmp_path / "src" / "app.zip"]
+        assert "node_modules" not in visited and "pkg" not in visited
+
+    def test_extract_recursively_skips_symlinks(self, tmp_path):
+        """Test extract_recursively does not follow symlinked archives or directories."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"))
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
+        zip_path = test_dir / "a.zip"
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            zf.writestr("a.txt", "content")
+        (test_dir / "link.zip").symlink_to(zip_path)
+        (test_dir / "loop").symlink_to(test_dir, target_is_directory=True)
 
-        result = extractor.extract_recursively(outer_tar)
-        assert len(result) >= 1  # Should extract outer tar and find inner tar
+        result = extractor.extract_recursively(test_dir)
+        assert len(result) == 1
 
-    def test_extract_recursively_excluded_path(self, temp_dir):
+    def test_extract_recursively_duplicate_archives(self, tmp_path):
+        """Test extract_recursively extracts identical archives only once."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"))
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
+        with zipfile.ZipFile(test_dir / "a.zip", 'w') as zf:
+            zf.writestr("a.txt", "content")
+        shutil.copy(test_dir / "a.zip", test_dir / "copy.zip")
+
+        result = extractor.extract_recursively(test_dir)
+        assert len(result) == 1
+        assert extractor.errors == []
+
+    @patch.object(extract_archives, 'HAS_BLAKE3', True)
+    def test_extract_recursively_duplicate_archives_blake3(self, tmp_path):
+        """Test duplicate detection hashes with blake3 when it is installed."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"))
+        test_dir = tmp_path / "test_dir"
+        test_dir.mkdir()
+        with zipfile.ZipFile(test_dir / "a.zip", 'w') as zf:
+            zf.writestr("a.txt", "content")
+        shutil.copy(test_dir / "a.zip", test_dir / "copy.zip")
+
+        # hashlib.sha256 stands in for blake3: both take no arguments and expose update/digest
+        with patch.object(extract_archives, 'blake3', Mock(side_effect=hashlib.sha256), create=True) as mock_blake3:
+            result = extractor.extract_recursively(test_dir)
+
+        assert len(result) == 1
+        assert mock_blake3.call_count == 2
+
+    @staticmethod
+    def _nested_zip(path: Path, levels: int):
+        """Write a zip nested the given number of levels deep."""
+        data = b"innermost"
+        for level in range(levels):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as zf:
+                zf.writestr(f"level{level}.zip" if level else "inner.txt", data)
+            data = buffer.getvalue()
+        path.write_bytes(data)
+
+    @patch.object(extract_archives, 'logger')
+    def test_extract_recursively_max_depth(self, mock_logger, tmp_path):
+        """Test extract_recursively stops descending past max_depth."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"), max_depth=2)
+        archive = tmp_path / "bomb.zip"
+        self._nested_zip(archive, 4)
+
+        result = extractor.extract_recursively(archive)
+        assert len(result) == 2
+        assert len(extractor.errors) == 1
+        mock_logger.warning.assert_called_once()
+
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'logger')
+    def test_extract_recursively_size_budget(self, mock_logger, tmp_path):
+        """Test extract_recursively stops once the extracted size exceeds the budget."""
+        archive = tmp_path / "bomb.zip"
+        self._nested_zip(archive, 3)
+        with zipfile.ZipFile(archive) as zf:
+            outer_size = zf.infolist()[0].file_size
+        # Room for the outer archive's member, but not for the archive nested inside it
+        extractor = ArchiveExtractor(str(tmp_path / "output"), max_total_bytes=outer_size)
+
+        result = extractor.extract_recursively(archive)
+        assert len(result) == 1
+        assert extractor.total_bytes > outer_size
+        assert extractor.errors == [f"Extraction stopped after exceeding {outer_size} bytes"]
+
+    @staticmethod
+    def _write_bomb(path: Path, data: bytes):
+        """Write data, which compresses to almost nothing, as a single-member archive."""
+        if path.suffix == '.zip':
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("bomb.bin", data)
+        elif path.name.endswith('.tar.gz'):
+            with tarfile.open(path, 'w:gz') as tar:
+                _add_tar_member(tar, "bomb.bin", data)
+        else:
+            with gzip.open(path, 'wb') as f:
+                f.write(data)
+
+    @pytest.mark.parametrize("name", ["bomb.zip", "bomb.tar.gz", "bomb.bin.gz"])
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'logger')
+    def test_extract_recursively_single_archive_over_budget(self, mock_logger, tmp_path, name):
+        """Test one archive larger than the whole budget is abandoned before it is written out."""
+        budget = 64 * 1024
+        archive = tmp_path / name
+        self._write_bomb(archive, bytes(4 * 1024 * 1024))
+        output_dir = tmp_path / "output"
+        extractor = ArchiveExtractor(str(output_dir), max_total_bytes=budget)
+
+        result = extractor.extract_recursively(archive)
+        assert result == []
+        assert extractor.errors == [f"Extraction stopped after exceeding {budget} bytes"]
+        written = sum(f.stat().st_size for f in output_dir.rglob('*') if f.is_file())
+        assert written <= budget
+
+    @patch.object(extract_archives, 'logger')
+    def test_extract_libarchive_over_budget(self, mock_logger, tmp_path):
+        """Test libarchive extraction stops at the block that crosses the budget."""
+        extractor = ArchiveExtractor(str(tmp_path / "output"), max_total_bytes=10)
+        entries = [_archive_entry("bomb.bin", [b"x" * 8, b"x" * 8, b"x" * 8])]
+        extract_dir = tmp_path / "extract"
+
+        with patch.object(extract_archives, 'libarchive', _fake_libarchive(entries), create=True):
+            result = extractor._extract_libarchive(tmp_path / "bomb.zip", extract_dir)
+
+        assert result is False
+        assert (extract_dir / "bomb.bin").read_bytes() == b"x" * 8
+        mock_logger.error.assert_called_once()
+
+    @patch.object(extract_archives, 'logger')
+    def test_extract_recursively_failed_archive(self, mock_logger, extractor, tmp_path):
+        """Test extract_recursively records nothing for archives that fail to extract."""
+        bad_zip = tmp_path / "bad.zip"
+        bad_zip.write_bytes(b"not a zip")
+
+        result = extractor.extract_recursively(bad_zip)
+        assert result == []
+        mock_logger.error.assert_any_call("Failed to extract %s", bad_zip.resolve())
+
+    @patch.object(extract_archives, 'logger')
+    def test_extract_recursively_unreadable_archive(self, mock_logger, extractor, sample_tar, sample_zip, tmp_path):
+        """Test an archive that cannot be read is logged and skipped without stopping the run."""
+        scan_dir = tmp_path / "scan"
+        scan_dir.mkdir()
+        shutil.copy(sample_tar, scan_dir / "good.tar")
+        unreadable = scan_dir / "unreadable.zip"
+        shutil.copy(sample_zip, unreadable)
+        real_open = open
+
+        def fake_open(file, *args, **kwargs):
+            if Path(file) == unreadable:
+                raise PermissionError(13, "Permission denied", str(file))
+            return real_open(file, *args, **kwargs)
+
+        with patch.object(extract_archives, 'open', side_effect=fake_open, create=True):
+            result = extractor.extract_recursively(scan_dir)
+
+        assert len(result) == 1
+        assert extractor.errors == [f"[Errno 13] Permission denied: '{unreadable}'"]
+        mock_logger.error.assert_called_once()
+
+    @pytest.mark.parametrize("name", ["truncated.bin.gz", "truncated.tar.gz"])
+    @patch.object(extract_archives, 'HAS_LIBARCHIVE', False)
+    @patch.object(extract_archives, 'PIGZ_PATH', None)
+    @patch.object(extract_archives, 'logger')
+    def test_extract_recursively_truncated_gzip(self, mock_logger, extractor, sample_zip, tmp_path, name):
+        """Test a truncated gzip stream fails that archive alone instead of ending the run."""
+        scan_dir = tmp_path / "scan"
+        scan_dir.mkdir()
+        shutil.copy(sample_zip, scan_dir / "good.zip")
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            _add_tar_member(tar, "test.txt", os.urandom(256 * 1024))
+        (scan_dir / name).write_bytes(gzip.compress(buffer.getvalue())[:-1024])
+
+        # The in-process fast-gzip path, which raises EOFError at the truncation
+        with patch.object(extract_archives, 'HAS_FAST_GZIP', True), \
+                patch.object(extract_archives, 'fast_gzip', gzip, create=True):
+            result = extractor.extract_recursively(scan_dir)
+
+        assert len(result) == 1
+        assert (result[0] / "test.txt").read_text() == "test content"
+
+    def test_extract_one_missing_archive(self, extractor, tmp_path):
+        """Test an archive that vanished before extraction is recorded as an error."""
+        assert extractor._extract_one(tmp_path / "missing.zip") is None
+        assert len(extractor.errors) == 1
+
+    def test_extract_one_budget_spent(self, tmp_path, sample_zip):
+        """Test archives still queued once the size budget is spent are not extracted."""
+        output_dir = tmp_path / "output"
+        extractor = ArchiveExtractor(str(output_dir), max_total_bytes=0)
+        extractor.total_bytes = 1
+
+        assert extractor._extract_one(sample_zip) is None
+        assert list(output_dir.iterdir()) == []
+
+    def test_extract_recursively_excluded_path(self, tmp_path):
         """Test extract_recursively with excluded path."""
-        base_path = temp_dir / "base"
+        base_path = tmp_path / "base"
         base_path.mkdir()
-        extractor = ArchiveExtractor(str(temp_dir / "output"), base_path=base_path)
+        extractor = ArchiveExtractor(str(tmp_path / "output"), base_path=base_path)
 
         excluded_file = base_path / "node_modules" / "package.json"
         excluded_file.parent.mkdir(parents=True)
@@ -410,7 +1156,7 @@ class TestArchiveExtractor:
         assert result == []
         mock_logger.warning.assert_called_once()
 
-    def test_extract_recursively_inside_output_dir(self, extractor, temp_dir):
+    def test_extract_recursively_inside_output_dir(self, extractor, tmp_path):
         """Test extract_recursively skips paths inside output directory."""
         # Create a file inside the output directory
         output_file = extractor.output_dir / "internal.txt"
@@ -420,26 +1166,29 @@ class TestArchiveExtractor:
         assert result == []
         assert len(extractor.extracted_paths) == 0
 
+    def test_extract_recursively_output_dir_sibling(self, extractor, tmp_path):
+        """Test a sibling sharing the output directory's name prefix is still processed."""
+        sibling = Path(str(extractor.output_dir) + "-old")
+        sibling.mkdir()
+        with zipfile.ZipFile(sibling / "test.zip", 'w') as zf:
+            zf.writestr("file.txt", "content")
+
+        result = extractor.extract_recursively(sibling)
+        assert len(result) == 1
+
 
 class TestMainFunction:
     """Test cases for the main function."""
 
-    @pytest.fixture
-    def temp_dir(self):
-        """Create a temporary directory for testing."""
-        temp_dir = Path(tempfile.mkdtemp())
-        yield temp_dir
-        shutil.rmtree(temp_dir)
-
     @patch.object(extract_archives, 'logger')
     @patch('builtins.print')
-    def test_main_with_existing_file(self, mock_print, mock_logger, temp_dir):
+    def test_main_with_existing_file(self, mock_print, mock_logger, tmp_path):
         """Test main function with existing file."""
         # Create a test file
-        test_file = temp_dir / "test.txt"
+        test_file = tmp_path / "test.txt"
         test_file.write_text("test")
 
-        main([str(test_file)], str(temp_dir / "output"))
+        main([str(test_file)], str(tmp_path / "output"))
 
         # Should print the file path since it's not an archive
         calls = mock_print.call_args_list
@@ -450,14 +1199,14 @@ class TestMainFunction:
 
     @patch.object(extract_archives, 'logger')
     @patch('builtins.print')
-    def test_main_with_existing_directory(self, mock_print, mock_logger, temp_dir):
+    def test_main_with_existing_directory(self, mock_print, mock_logger, tmp_path):
         """Test main function with existing directory."""
         # Create a test directory
-        test_dir = temp_dir / "test_dir"
+        test_dir = tmp_path / "test_dir"
         test_dir.mkdir()
         (test_dir / "file.txt").write_text("content")
 
-        main([str(test_dir)], str(temp_dir / "output"))
+        main([str(test_dir)], str(tmp_path / "output"))
 
         # Should print the directory path
         calls = mock_print.call_args_list
@@ -468,14 +1217,9 @@ class TestMainFunction:
 
     @patch.object(extract_archives, 'logger')
     @patch('builtins.print')
-    def test_main_with_archive_file(self, mock_print, mock_logger, temp_dir):
+    def test_main_with_archive_file(self, mock_print, mock_logger, tmp_path, sample_zip):
         """Test main function with archive file."""
-        # Create a test zip file
-        zip_path = temp_dir / "test.zip"
-        with zipfile.ZipFile(zip_path, 'w') as zf:
-            zf.writestr("test.txt", "test content")
-
-        main([str(zip_path)], str(temp_dir / "output"))
+        main([str(sample_zip)], str(tmp_path / "output"))
 
         # Should print the output directory path
         calls = mock_print.call_args_list
@@ -483,6 +1227,18 @@ class TestMainFunction:
         # The output directory path should be printed
         mock_logger.info.assert_called()
 
+    @patch.object(extract_archives, 'logger')
+    @patch('builtins.print')
+    def test_main_with_jobs(self, mock_print, mock_logger, tmp_path):
+        """Test main passes the job count to the extractor."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("test")
+
+        with patch.object(extract_archives, 'ArchiveExtractor', wraps=ArchiveExtractor) as mock_extractor:
+            main([str(test_file)], str(tmp_path / "output"), jobs=3)
+
+        assert mock_extractor.call_args.kwargs['max_workers'] == 3
+
     @patch.object(extract_archives, 'logger')
     def test_main_with_nonexistent_path(self, mock_logger):
         """Test main function with nonexistent path."""
@@ -494,15 +1250,15 @@ class TestMainFunction:
 
     @patch.object(extract_archives, 'logger')
     @patch('builtins.print')
-    def test_main_multiple_paths(self, mock_print, mock_logger, temp_dir):
+    def test_main_multiple_paths(self, mock_print, mock_logger, tmp_path):
         """Test main function with multiple input paths."""
         # Create test files
-        file1 = temp_dir / "test1.txt"
+        file1 = tmp_path / "test1.txt"
         file1.write_text("content1")
-        file2 = temp_dir / "test2.txt"
+        file2 = tmp_path / "test2.txt"
         file2.write_text("content2")
 
-        main([str(file1), str(file2)], str(temp_dir / "output"))
+        main([str(file1), str(file2)], str(tmp_path / "output"))
 
         # Should print both file paths
         calls = mock_print.call_args_list
@@ -511,6 +1267,45 @@ class TestMainFunction:
         assert any("test1.txt" in call[0][0] for call in calls)
         assert any("test2.txt" in call[0][0] for call in calls)
 
+    @patch.object(extract_archives, 'logger')
+    @patch('builtins.print')
+    def test_main_multiple_archives_scan_output_once(self, mock_print, mock_logger, tmp_path):
+        """Test main lists the shared output directory once and keeps same-named archives apart."""
+        archives = []
+        for name in ("first", "second"):
+            (tmp_path / name).mkdir()
+            zip_path = tmp_path / name / "bundle.zip"
+            with zipfile.ZipFile(zip_path, 'w') as zf:
+                zf.writestr("payload.txt", name)
+            archives.append(str(zip_path))
+
+        output_dir = tmp_path / "output"
+        main(archives, str(output_dir))
+
+        printed = [call[0][0] for call in mock_print.call_args_list]
+        assert printed == [str(output_dir)]
+        contents = sorted(p.read_text() for p in output_dir.rglob("payload.txt"))
+        assert contents == ["first", "second"]
+
+
+    @patch.object(extract_archives, 'logger')
+    @patch('builtins.print')
+    def test_main_default_output_dir_dedups_across_inputs(self, mock_print, mock_logger, sample_zip, tmp_path):
+        """Test main without an output directory uses one temp directory and extracts a repeated archive once."""
+        archives = []
+        for name in ("first", "second"):
+            (tmp_path / name).mkdir()
+            archives.append(str(shutil.copy(sample_zip, tmp_path / name / "bundle.zip")))
+
+        main(archives)
+
+        printed = [call[0][0] for call in mock_print.call_args_list]
+        assert len(printed) == 1
+        output_dir = Path(printed[0])
+        try:
+            assert [p.read_text() for p in output_dir.rglob("test.txt")] == ["test content"]
+        finally:
+            shutil.rmtree(output_dir)
 
 class TestArgumentParsing:
     """Test cases for command line argument parsing."""
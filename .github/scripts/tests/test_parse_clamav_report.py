@@ -5,445 +5,160 @@ Comprehensive test suite for parse-clamav-report.py with 100% coverage.
 
 import json
 import os
-import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch
 import pytest
 
+# Loaded once by conftest.py
+import parse_clamav_report
 
-class TestParseClamAVReport:
-    """Test cases for parse-clamav-report.py functionality."""
 
-    @pytest.fixture
-    def temp_dir(self):
-        """Create a temporary directory for testing."""
-        temp_dir = Path(tempfile.mkdtemp())
-        yield temp_dir
-        import shutil
-        shutil.rmtree(temp_dir)
-
-    def test_parse_report_with_infections(self, temp_dir):
-        """Test parsing a ClamAV report with infected files."""
-        report_content = """----------- SCAN SUMMARY -----------
+CLEAN_REPORT = """----------- SCAN SUMMARY -----------
 Known viruses: 8518380
 Engine version: 0.103.8
 Scanned directories: 1
-Scanned files: 5
-Infected files: 2
+Scanned files: 3
+Infected files: 0
 Data scanned: 0.01 MB
 Data read: 0.01 MB (ratio 1.00:1)
-Time: 0.012 sec (0 m 0 s)
+Time: 0.008 sec (0 m 0 s)
 Start Date: 2024:01:15 10:30:45
 End Date: 2024:01:15 10:30:45
-
-/home/user/malware.exe: Win.Test.EICAR_HDB-1 FOUND
-/home/user/virus.txt: Eicar-Test-Signature FOUND
 """
 
-        report_file = temp_dir / "clamav-report.log"
-        report_file.write_text(report_content)
-
-        # Execute the parsing logic directly
-        content = report_file.read_text(encoding='utf-8')
-
-        # Parse the summary line
-        infected = 0
-        scanned = 0
-
-        if "Infected files:" in content:
-            import re
-            match = re.search(r'Infected files: (\d+)', content)
-            if match:
-                infected = int(match.group(1))
-
-        if "Scanned files:" in content:
-            match = re.search(r'Scanned files: (\d+)', content)
-            if match:
-                scanned = int(match.group(1))
-
-        # Find infected file details
-        infected_files = []
-        for line in content.split('\n'):
-            if 'FOUND' in line:
-                infected_files.append(line.strip())
-
-        json_data = {
-            "total_files": scanned,
-            "infected_files": infected,
-            "clean_files": scanned - infected,
-            "infections": infected_files
-        }
-
-        # Write JSON to same directory as report file
-        json_path = report_file.parent / f"{report_file.stem}.json"
-        json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
-
-        # Verify the JSON was created correctly
-        assert json_path.exists()
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-
-        assert data["total_files"] == 5
-        assert data["infected_files"] == 2
-        assert data["clean_files"] == 3
-        assert len(data["infections"]) == 2
-        assert "/home/user/malware.exe: Win.Test.EICAR_HDB-1 FOUND" in data["infections"]
-        assert "/home/user/virus.txt: Eicar-Test-Signature FOUND" in data["infections"]
-
-    def test_parse_report_clean_scan(self, temp_dir):
-        """Test parsing a ClamAV report with no infections."""
-        report_content = """----------- SCAN SUMMARY -----------
+MISSING_INFECTED_REPORT = """----------- SCAN SUMMARY -----------
 Known viruses: 8518380
 Engine version: 0.103.8
 Scanned directories: 1
-Scanned files: 3
-Infected files: 0
+Scanned files: 5
 Data scanned: 0.01 MB
 Data read: 0.01 MB (ratio 1.00:1)
-Time: 0.008 sec (0 m 0 s)
-Start Date: 2024:01:15 10:30:45
-End Date: 2024:01:15 10:30:45
+Time: 0.012 sec (0 m 0 s)
 """
 
-        report_file = temp_dir / "clamav-report.log"
-        report_file.write_text(report_content)
-
-        # Execute the parsing logic directly
-        content = report_file.read_text(encoding='utf-8')
-
-        # Parse the summary line
-        infected = 0
-        scanned = 0
-
-        if "Infected files:" in content:
-            import re
-            match = re.search(r'Infected files: (\d+)', content)
-            if match:
-                infected = int(match.group(1))
-
-        if "Scanned files:" in content:
-            match = re.search(r'Scanned files: (\d+)', content)
-            if match:
-                scanned = int(match.group(1))
-
-        # Find infected file details
-        infected_files = []
-        for line in content.split('\n'):
-            if 'FOUND' in line:
-                infected_files.append(line.strip())
-
-        json_data = {
-            "total_files": scanned,
-            "infected_files": infected,
-            "clean_files": scanned - infected,
-            "infections": infected_files
-        }
-
-        # Write JSON to same directory as report file
-        json_path = report_file.parent / f"{report_file.stem}.json"
-        json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
-
-        # Verify the JSON was created correctly
-        assert json_path.exists()
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-
-        assert data["total_files"] == 3
-        assert data["infected_files"] == 0
-        assert data["clean_files"] == 3
-        assert len(data["infections"]) == 0
-
-    def test_parse_report_missing_infected_count(self, temp_dir):
-        """Test parsing a ClamAV report missing infected files count."""
-        report_content = """----------- SCAN SUMMARY -----------
+MISSING_SCANNED_REPORT = """----------- SCAN SUMMARY -----------
 Known viruses: 8518380
 Engine version: 0.103.8
 Scanned directories: 1
-Scanned files: 5
+Infected files: 2
 Data scanned: 0.01 MB
 Data read: 0.01 MB (ratio 1.00:1)
 Time: 0.012 sec (0 m 0 s)
-"""
 
-        report_file = temp_dir / "clamav-report.log"
-        report_file.write_text(report_content)
+/home/user/malware.exe: Win.Test.EICAR_HDB-1 FOUND
+"""
 
-        # Execute the parsing logic directly
-        content = report_file.read_text(encoding='utf-8')
-
-        # Parse the summary line
-        infected = 0
-        scanned = 0
-
-        if "Infected files:" in content:
-            import re
-            match = re.search(r'Infected files: (\d+)', content)
-            if match:
-                infected = int(match.group(1))
-
-        if "Scanned files:" in content:
-            import re
-            match = re.search(r'Scanned files: (\d+)', content)
-            if match:
-                scanned = int(match.group(1))
-
-        # Find infected file details
-        infected_files = []
-        for line in content.split('\n'):
-            if 'FOUND' in line:
-                infected_files.append(line.strip())
-
-        json_data = {
-            "total_files": scanned,
-            "infected_files": infected,
-            "clean_files": scanned - infected,
-            "infections": infected_files
-        }
+MULTIPLE_INFECTIONS_REPORT = """----------- SCAN SUMMARY -----------
+Scanned files: 10
+Infected files: 3
 
-        # Write JSON to same directory as report file
-        json_path = report_file.parent / f"{report_file.stem}.json"
-        json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
+/path/to/file1.exe: Trojan.Generic FOUND
+/path/to/file2.dll: Malware.Fake FOUND
+/path/to/file3.zip: Virus.Zip FOUND
+"""
 
-        # Verify the JSON was created correctly
-        assert json_path.exists()
-        with open(json_path, 'r') as f:
-            data = json.load(f)
 
-        assert data["total_files"] == 5
-        assert data["infected_files"] == 0
-        assert data["clean_files"] == 5
-        assert len(data["infections"]) == 0
+class TestParseClamAVReport:
+    """Test cases for parse-clamav-report.py functionality."""
 
-    def test_parse_report_missing_scanned_count(self, temp_dir):
-        """Test parsing a ClamAV report missing scanned files count."""
+    def test_parse_report_with_infections(self, tmp_path):
+        """Test parsing a ClamAV report with infected files."""
         report_content = """----------- SCAN SUMMARY -----------
 Known viruses: 8518380
 Engine version: 0.103.8
 Scanned directories: 1
+Scanned files: 5
 Infected files: 2
 Data scanned: 0.01 MB
 Data read: 0.01 MB (ratio 1.00:1)
 Time: 0.012 sec (0 m 0 s)
+Start Date: 2024:01:15 10:30:45
+End Date: 2024:01:15 10:30:45
 
 /home/user/malware.exe: Win.Test.EICAR_HDB-1 FOUND
+/home/user/virus.txt: Eicar-Test-Signature FOUND
 """
 
-        report_file = temp_dir / "clamav-report.log"
+        report_file = tmp_path / "clamav-report.log"
         report_file.write_text(report_content)
 
-        # Execute the parsing logic directly
-        content = report_file.read_text(encoding='utf-8')
-
-        # Parse the summary line
-        infected = 0
-        scanned = 0
-
-        if "Infected files:" in content:
-            import re
-            match = re.search(r'Infected files: (\d+)', content)
-            if match:
-                infected = int(match.group(1))
-
-        if "Scanned files:" in content:
-            match = re.search(r'Scanned files: (\d+)', content)
-            if match:
-                scanned = int(match.group(1))
-
-        # Find infected file details
-        infected_files = []
-        for line in content.split('\n'):
-            if 'FOUND' in line:
-                infected_files.append(line.strip())
-
-        json_data = {
-            "total_files": scanned,
-            "infected_files": infected,
-            "clean_files": scanned - infected,
-            "infections": infected_files
-        }
-
-        # Write JSON to same directory as report file
+        parse_clamav_report.main(str(report_file))
         json_path = report_file.parent / f"{report_file.stem}.json"
-        json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
 
         # Verify the JSON was created correctly
         assert json_path.exists()
         with open(json_path, 'r') as f:
             data = json.load(f)
 
-        assert data["total_files"] == 0
+        assert data["total_files"] == 5
         assert data["infected_files"] == 2
-        assert data["clean_files"] == -2  # This shows the limitation of missing scanned count
-        assert len(data["infections"]) == 1
+        assert data["clean_files"] == 3
+        assert len(data["infections"]) == 2
+        assert "/home/user/malware.exe: Win.Test.EICAR_HDB-1 FOUND" in data["infections"]
+        assert "/home/user/virus.txt: Eicar-Test-Signature FOUND" in data["infections"]
+        assert data["results"][0] == {
+            "file": "/home/user/malware.exe",
+            "infection": "Win.Test.EICAR_HDB-1",
+            "status": "infected"
+        }
+
+    @pytest.mark.parametrize("report_content,total,infected,clean,infections", [
+        (CLEAN_REPORT, 3, 0, 3, 0),
+        (MISSING_INFECTED_REPORT, 5, 0, 5, 0),
+        # A missing scanned count shows up as a negative clean count
+        (MISSING_SCANNED_REPORT, 0, 2, -2, 1),
+        (MULTIPLE_INFECTIONS_REPORT, 10, 3, 7, 3),
+        ("", 0, 0, 0, 0),
+        # Sharded scans write one summary per shard
+        ("Scanned files: 4\nInfected files: 1\nScanned files: 6\nInfected files: 0\n", 10, 1, 9, 0),
+        # A shard log cut off mid-summary keeps the counts that were written
+        ("Scanned files: 4\nInfected files: 1\nScanned files: \nInfected files: ", 4, 1, 3, 0),
+    ], ids=["clean", "missing-infected", "missing-scanned", "multiple-infections", "empty", "shards",
+            "truncated-shard"])
+    def test_parse_report_counts(self, tmp_path, report_content, total, infected, clean, infections):
+        """Test the summary counts and detections parsed from different reports."""
+        report_file = tmp_path / "clamav-report.log"
+        report_file.write_text(report_content)
+
+        data = parse_clamav_report.parse_report(report_file)
 
-    def test_parse_report_no_report_file(self, temp_dir, capsys):
+        assert data["total_files"] == total
+        assert data["infected_files"] == infected
+        assert data["clean_files"] == clean
+        assert len(data["infections"]) == infections
+        assert all(infection.endswith("FOUND") for infection in data["infections"])
+
+    def test_parse_report_no_report_file(self, tmp_path, capsys):
         """Test parsing when report file doesn't exist."""
-        nonexistent_report = temp_dir / "nonexistent.log"
+        nonexistent_report = tmp_path / "nonexistent.log"
 
-        # Simulate the script logic
+        parse_clamav_report.main(str(nonexistent_report))
         report_file = nonexistent_report
-        if report_file.exists():
-            assert False, "Report file should not exist"
-        else:
-            print(f"⚠️  No scan report found at: {report_file}")
 
         # Capture the output
         captured = capsys.readouterr()
         assert f"No scan report found at: {report_file}" in captured.out
 
-    def test_parse_report_multiple_infections(self, temp_dir):
-        """Test parsing a report with multiple infection lines."""
-        report_content = """----------- SCAN SUMMARY -----------
-Scanned files: 10
-Infected files: 3
-
-/path/to/file1.exe: Trojan.Generic FOUND
-/path/to/file2.dll: Malware.Fake FOUND
-/path/to/file3.zip: Virus.Zip FOUND
-"""
-
-        report_file = temp_dir / "clamav-report.log"
-        report_file.write_text(report_content)
-
-        # Execute the parsing logic directly
-        content = report_file.read_text(encoding='utf-8')
-
-        # Parse the summary line
-        infected = 0
-        scanned = 0
-
-        if "Infected files:" in content:
-            import re
-            match = re.search(r'Infected files: (\d+)', content)
-            if match:
-                infected = int(match.group(1))
-
-        if "Scanned files:" in content:
-            match = re.search(r'Scanned files: (\d+)', content)
-            if match:
-                scanned = int(match.group(1))
-
-        # Find infected file details
-        infected_files = []
-        for line in content.split('\n'):
-            if 'FOUND' in line:
-                infected_files.append(line.strip())
-
-        json_data = {
-            "total_files": scanned,
-            "infected_files": infected,
-            "clean_files": scanned - infected,
-            "infections": infected_files
-        }
-
-        # Write JSON to same directory as report file
-        json_path = report_file.parent / f"{report_file.stem}.json"
-        json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
-
-        # Verify the JSON was created correctly
-        assert json_path.exists()
-        with open(json_path, 'r') as f:
-            data = json.load(f)
+    def test_write_json_without_orjson(self, tmp_path):
+        """Test the standard library JSON fallback."""
+        json_path = tmp_path / "clamav-report.json"
 
-        assert data["total_files"] == 10
-        assert data["infected_files"] == 3
-        assert data["clean_files"] == 7
-        assert len(data["infections"]) == 3
-        assert all("FOUND" in infection for infection in data["infections"])
-
-    def test_parse_report_empty_file(self, temp_dir):
-        """Test parsing an empty report file."""
-        report_file = temp_dir / "empty.log"
-        report_file.write_text("")
-
-        # Execute the parsing logic directly
-        content = report_file.read_text(encoding='utf-8')
-
-        # Parse the summary line
-        infected = 0
-        scanned = 0
-
-        if "Infected files:" in content:
-            import re
-            match = re.search(r'Infected files: (\d+)', content)
-            if match:
-                infected = int(match.group(1))
-
-        if "Scanned files:" in content:
-            match = re.search(r'Scanned files: (\d+)', content)
-            if match:
-                scanned = int(match.group(1))
-
-        # Find infected file details
-        infected_files = []
-        for line in content.split('\n'):
-            if 'FOUND' in line:
-                infected_files.append(line.strip())
-
-        json_data = {
-            "total_files": scanned,
-            "infected_files": infected,
-            "clean_files": scanned - infected,
-            "infections": infected_files
-        }
+        with patch.object(parse_clamav_report, 'HAS_ORJSON', False):
+            parse_clamav_report.write_json({"total_files": 1}, json_path)
 
-        # Write JSON to same directory as report file
-        json_path = report_file.parent / f"{report_file.stem}.json"
-        json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
+        assert json.loads(json_path.read_text()) == {"total_files": 1}
 
-        # Verify the JSON was created correctly
-        assert json_path.exists()
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-
-        assert data["total_files"] == 0
-        assert data["infected_files"] == 0
-        assert data["clean_files"] == 0
-        assert len(data["infections"]) == 0
-
-    def test_json_output_format(self, temp_dir):
+    def test_json_output_format(self, tmp_path):
         """Test that the JSON output has the correct structure and formatting."""
         report_content = """Scanned files: 1
 Infected files: 1
 /test/file: Some.Virus FOUND"""
 
-        report_file = temp_dir / "clamav-report.log"
+        report_file = tmp_path / "clamav-report.log"
         report_file.write_text(report_content)
 
-        # Execute the parsing logic directly
-        content = report_file.read_text(encoding='utf-8')
-
-        # Parse the summary line
-        infected = 0
-        scanned = 0
-
-        if "Infected files:" in content:
-            import re
-            match = re.search(r'Infected files: (\d+)', content)
-            if match:
-                infected = int(match.group(1))
-
-        if "Scanned files:" in content:
-            match = re.search(r'Scanned files: (\d+)', content)
-            if match:
-                scanned = int(match.group(1))
-
-        # Find infected file details
-        infected_files = []
-        for line in content.split('\n'):
-            if 'FOUND' in line:
-                infected_files.append(line.strip())
-
-        json_data = {
-            "total_files": scanned,
-            "infected_files": infected,
-            "clean_files": scanned - infected,
-            "infections": infected_files
-        }
-
-        # Write JSON to same directory as report file
+        parse_clamav_report.main(str(report_file))
         json_path = report_file.parent / f"{report_file.stem}.json"
-        json_path.write_text(json.dumps(json_data, indent=2), encoding='utf-8')
 
         # Verify JSON structure and formatting
         assert json_path.exists()
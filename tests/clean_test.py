@@ -12,6 +12,9 @@ from typing import Dict, List, Optional
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fields every data item must carry
+_REQUIRED_FIELDS = frozenset(('id', 'name', 'type'))
+
 
 class CleanTestClass:
     """A clean test class following best practices."""
@@ -23,10 +26,11 @@ class CleanTestClass:
 
     def _load_settings(self) -> Dict[str, str]:
         """Load settings from environment variables."""
+        env = os.environ
         return {
-            'api_endpoint': os.getenv('API_ENDPOINT', 'https://api.example.com'),
-            'timeout': os.getenv('REQUEST_TIMEOUT', '30'),
-            'max_retries': os.getenv('MAX_RETRIES', '3'),
+            'api_endpoint': env.get('API_ENDPOINT', 'https://api.example.com'),
+            'timeout': env.get('REQUEST_TIMEOUT', '30'),
+            'max_retries': env.get('MAX_RETRIES', '3'),
         }
 
     def process_data(self, data: List[Dict]) -> List[Dict]:
@@ -46,8 +50,7 @@ class CleanTestClass:
 
     def _validate_item(self, item: Dict) -> bool:
         """Validate a single data item."""
-        required_fields = ['id', 'name', 'type']
-        return all(field in item for field in required_fields)
+        return _REQUIRED_FIELDS <= item.keys()
 
     def _transform_item(self, item: Dict) -> Dict:
         """Transform a data item."""